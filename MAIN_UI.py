@@ -1,8 +1,5 @@
 import sys
 import os
-import csv
-import re
-import asyncio
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -11,6 +8,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QCheckBox,
     QPushButton,
     QSystemTrayIcon,
     QFrame,
@@ -27,7 +25,8 @@ try:
     windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 except ImportError:
     pass
-from playwright.async_api import async_playwright
+# Playwright is imported when the scraper starts, not with the window
+from workers import ScraperWorker
 
 
 class SmallBoxSelector(QWidget):
@@ -113,6 +112,11 @@ class SocialMediaScraperApp_WOUT(QMainWindow):
         self.scroll_interval_input.setPlaceholderText("Scroll interval (seconds)")
         inputs_layout.addWidget(self.scroll_interval_input)
 
+        # The scroll interval is a starting point, shortened while tweets keep coming and lengthened on slow loads
+        self.adaptive_checkbox = QCheckBox("Adapt scroll interval to the feed")
+        self.adaptive_checkbox.setChecked(True)
+        inputs_layout.addWidget(self.adaptive_checkbox)
+
         # URL input for Twitter
         self.twitter_url_input = QLineEdit()
         self.twitter_url_input.setPlaceholderText("Twitter URL (optional)")
@@ -129,6 +133,11 @@ class SocialMediaScraperApp_WOUT(QMainWindow):
         self.start_button.clicked.connect(self.start_scraper)
         main_layout.addWidget(self.start_button)
 
+        self.stop_button = QPushButton("Stop Scraper")
+        self.stop_button.clicked.connect(self.stop_scraper)
+        self.stop_button.setEnabled(False)
+        main_layout.addWidget(self.stop_button)
+
         # Status label
         self.status_label = QLabel()
         main_layout.addWidget(self.status_label)
@@ -173,112 +182,59 @@ class SocialMediaScraperApp_WOUT(QMainWindow):
         self.tray_icon.activated.connect(self.tray_icon_clicked)
         self.tray_icon.show()
 
+        self.scraper_worker = None
+
     def tray_icon_clicked(self, reason):
         if reason == QSystemTrayIcon.DoubleClick:
             self.showNormal()
             self.activateWindow()
 
-    async def extract_tweets(self, page):
-        await page.wait_for_selector('article div[lang]')
-        tweets = await page.query_selector_all('article div[lang]')
-        tweet_texts = [await tweet.inner_text() for tweet in tweets]
-        return tweet_texts
-
-    async def save_tweets_to_csv(self, tweets):
-        with open('tweets.txt', 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            for tweet in tweets:
-                writer.writerow([tweet])
-
-    async def scrape_linkedin(self):
-        self.status_label.setText("Scraping LinkedIn posts...")
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            page = await browser.new_page()
-
-            await page.goto('https://www.linkedin.com')
-
-            # Wait for the posts to load
-            await page.wait_for_selector('.feed-shared-update-v2', timeout=60000)
-
-            # Extract post content
-            posts_data = []
+    def start_scraper(self):
+        selected_platform = getattr(self.platform_selector, 'selected_option', None)
+        platform = 'linkedin' if selected_platform == "LinkedIn (Coming soon!)" else 'twitter'
+        try:
             total_run_time = int(self.total_run_time_input.text())
             scroll_interval = int(self.scroll_interval_input.text())
-            start_time = asyncio.get_event_loop().time()
-
-            while asyncio.get_event_loop().time() - start_time < total_run_time:
-                # Scroll the page
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                await asyncio.sleep(scroll_interval)
-
-                # Extract post content after scrolling
-                post_elements = await page.query_selector_all('.feed-shared-update-v2')
-                for post_element in post_elements:
-                    post_content = await post_element.inner_html()
-                    # Clean HTML content if needed
-                    cleaned_content = re.sub('<[^<]+?>', '', post_content)
-                    posts_data.append(cleaned_content)
-
-            # Save data to a file
-            # Example: Save data to a CSV file
-            with open('linkedin_posts.txt', 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Post Content'])
-                for post in posts_data:
-                    writer.writerow([post])
-
-            await browser.close()
-
-        self.status_label.setText("LinkedIn posts scraped successfully!")
-
-    async def main(self):
-        total_run_time = int(self.total_run_time_input.text())
-        scroll_interval = int(self.scroll_interval_input.text())
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            context = await browser.new_context()
-            page = await context.new_page()
-
-            # Check if LinkedIn is selected
-            selected_platform = self.platform_selector.selected_option
-            if selected_platform == "LinkedIn (Coming soon!)":
-                await self.scrape_linkedin()
-            else:
-                twitter_url = self.twitter_url_input.text().strip()
-                await self.scrape_twitter(page, total_run_time, scroll_interval, twitter_url)
-
-            await browser.close()
-
-    async def scrape_twitter(self, page, total_run_time, scroll_interval, twitter_url='https://twitter.com/'):
-        if not twitter_url:
-            twitter_url = 'https://twitter.com'
-        await page.goto(twitter_url, timeout=60000)
-        saved_tweets = await self.extract_tweets(page)
-        start_time = asyncio.get_event_loop().time()
-
-        async def check_for_new_tweets():
-            nonlocal saved_tweets
-            while asyncio.get_event_loop().time() - start_time < total_run_time:
-                await asyncio.sleep(scroll_interval)
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                new_tweets = await self.extract_tweets(page)
-                if new_tweets[0] != saved_tweets[0]:
-                    self.status_label.setText("First tweet has changed. Saving tweets to CSV...")
-                    await self.save_tweets_to_csv(saved_tweets)
-                    saved_tweets = new_tweets
-
-        asyncio.create_task(check_for_new_tweets())
-        await asyncio.sleep(total_run_time)
-
-    def start_scraper(self):
-        selected_platform = self.platform_selector.selected_option
-        if selected_platform == "LinkedIn (Coming soon!)":
-            asyncio.run(self.scrape_linkedin())
-        else:
-            asyncio.run(self.main())
+        except ValueError:
+            self.status_label.setText("Run time and scroll interval must be whole numbers of seconds")
+            return
+
+        from scraper_engine import ScraperEngine
+        engine = ScraperEngine(
+            total_run_time,
+            scroll_interval,
+            urls=[self.twitter_url_input.text().strip()],
+            headless=False,  # Keep the window so users can log in, the profile remembers the session
+            adaptive=self.adaptive_checkbox.isChecked(),
+        )
+        self.scraper_worker = ScraperWorker(engine, platform, self)
+        self.scraper_worker.status.connect(self.show_status)
+        self.scraper_worker.progress.connect(self.show_progress)
+        self.scraper_worker.failed.connect(lambda error: self.show_status(f"An error occurred: {error}"))
+        self.scraper_worker.finished.connect(self.scraper_finished)
+
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText("Scraper is running...")
+        self.scraper_worker.start()
+
+    def stop_scraper(self):
+        if self.scraper_worker is not None:
+            self.stop_button.setEnabled(False)
+            self.status_label.setText("Stopping scraper...")
+            self.scraper_worker.stop()
+
+    def scraper_finished(self):
+        self.scraper_worker.deleteLater()
+        self.scraper_worker = None
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+
+    def show_status(self, text):
+        self.status_label.setText(text)
+
+    def show_progress(self, saved_count, tweets_per_second):
+        self.status_label.setText(f"Saved {saved_count} tweets ({tweets_per_second:.2f} tweets/sec)")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
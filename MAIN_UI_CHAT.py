@@ -1,8 +1,5 @@
 import sys
 import os
-import csv
-import re
-import asyncio
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -11,6 +8,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QCheckBox,
     QPushButton,
     QSystemTrayIcon,
     QFrame,
@@ -18,13 +16,9 @@ from PyQt5.QtWidgets import (
     QSizePolicy,
     QTextEdit
 )
-from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtGui import QPixmap, QIcon, QTextCursor
 from PyQt5.QtCore import Qt
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-import openai
+from PyQt5 import sip
 from PyQt5.QtGui import QMovie
 
 basedir = os.path.dirname(__file__)
@@ -35,7 +29,8 @@ try:
     windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 except ImportError:
     pass
-from playwright.async_api import async_playwright
+# The browser and LLM stacks are imported when the scraper starts or the chat opens, not with the window
+from workers import ChatWorker, LiveIndexSignals, ScraperWorker
 
 
 class SmallBoxSelector(QWidget):
@@ -121,6 +116,11 @@ class SocialMediaScraperApp(QMainWindow):
         self.scroll_interval_input.setPlaceholderText("Scroll interval (seconds)")
         inputs_layout.addWidget(self.scroll_interval_input)
 
+        # The scroll interval is a starting point, shortened while tweets keep coming and lengthened on slow loads
+        self.adaptive_checkbox = QCheckBox("Adapt scroll interval to the feed")
+        self.adaptive_checkbox.setChecked(True)
+        inputs_layout.addWidget(self.adaptive_checkbox)
+
         # URL input for Twitter
         self.twitter_url_input = QLineEdit()
         self.twitter_url_input.setPlaceholderText("Twitter URL")
@@ -137,6 +137,11 @@ class SocialMediaScraperApp(QMainWindow):
         self.start_button.clicked.connect(self.start_scraper)
         main_layout.addWidget(self.start_button)
 
+        self.stop_button = QPushButton("Stop Scraper")
+        self.stop_button.clicked.connect(self.stop_scraper)
+        self.stop_button.setEnabled(False)
+        main_layout.addWidget(self.stop_button)
+
         # New button for new actions
         self.new_button = QPushButton("Chat with Data")
         self.new_button.clicked.connect(self.new_function)
@@ -186,6 +191,11 @@ class SocialMediaScraperApp(QMainWindow):
         self.tray_icon.activated.connect(self.tray_icon_clicked)
         self.tray_icon.show()
 
+        self.scraper_worker = None
+        self.chat_worker = None
+        self.live_indexer = None
+        self.stopping_indexer = None
+
         # Store the original central widget for later use
         self.original_central_widget = central_widget
 
@@ -194,149 +204,112 @@ class SocialMediaScraperApp(QMainWindow):
             self.showNormal()
             self.activateWindow()
 
-    async def extract_tweets(self, page):
-        await page.wait_for_selector('article div[lang]')
-        tweets = await page.query_selector_all('article div[lang]')
-        tweet_texts = [await tweet.inner_text() for tweet in tweets]
-        return tweet_texts
-
-    async def save_tweets_to_csv(self, tweets):
-        with open('tweets.txt', 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            for tweet in tweets:
-                writer.writerow([tweet])
-
-    async def scrape_linkedin(self):
-        self.status_label.setText("Scraping LinkedIn posts...")
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            page = await browser.new_page()
-
-            await page.goto('https://www.linkedin.com')
-
-            # Wait for the posts to load
-            await page.wait_for_selector('.feed-shared-update-v2', timeout=60000)
-
-            # Extract post content
-            posts_data = []
+    def start_scraper(self):
+        selected_platform = getattr(self.platform_selector, 'selected_option', None)
+        platform = 'linkedin' if selected_platform == "LinkedIn (Coming soon!)" else 'twitter'
+        try:
             total_run_time = int(self.total_run_time_input.text())
             scroll_interval = int(self.scroll_interval_input.text())
-            start_time = asyncio.get_event_loop().time()
-
-            while asyncio.get_event_loop().time() - start_time < total_run_time:
-                # Scroll the page
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                await asyncio.sleep(scroll_interval)
-
-                # Extract post content after scrolling
-                post_elements = await page.query_selector_all('.feed-shared-update-v2')
-                for post_element in post_elements:
-                    post_content = await post_element.inner_html()
-                    # Clean HTML content if needed
-                    cleaned_content = re.sub('<[^<]+?>', '', post_content)
-                    posts_data.append(cleaned_content)
-
-            # Save data to a file
-            # Example: Save data to a CSV file
-            with open('linkedin_posts.txt', 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Post Content'])
-                for post in posts_data:
-                    writer.writerow([post])
-
-            await browser.close()
-
-        self.status_label.setText("LinkedIn posts scraped successfully!")
-
-    async def main(self):
-        total_run_time = int(self.total_run_time_input.text())
-        scroll_interval = int(self.scroll_interval_input.text())
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            context = await browser.new_context()
-            page = await context.new_page()
-
-            # Check if LinkedIn is selected
-            selected_platform = self.platform_selector.selected_option
-            if selected_platform == "LinkedIn (Coming soon!)":
-                await self.scrape_linkedin()
-            else:
-                twitter_url = self.twitter_url_input.text().strip()
-                await self.scrape_twitter(page, total_run_time, scroll_interval, twitter_url)
-
-            await browser.close()
-
-    async def scrape_twitter(self, page, total_run_time, scroll_interval, twitter_url='https://twitter.com'):
-        if not twitter_url:
-            twitter_url = 'https://twitter.com'
-        await page.goto(twitter_url, timeout=60000)
-        saved_tweets = await self.extract_tweets(page)
-        start_time = asyncio.get_event_loop().time()
-
-        async def check_for_new_tweets():
-            nonlocal saved_tweets
-            while asyncio.get_event_loop().time() - start_time < total_run_time:
-                await asyncio.sleep(scroll_interval)
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                new_tweets = await self.extract_tweets(page)
-                if new_tweets[0] != saved_tweets[0]:
-                    self.status_label.setText("Saved tweets to CSV")
-                    await self.save_tweets_to_csv(saved_tweets)
-                    saved_tweets = new_tweets
-
-        asyncio.create_task(check_for_new_tweets())
-        await asyncio.sleep(total_run_time)
-
-    def start_scraper(self):
-        selected_platform = self.platform_selector.selected_option
-        if selected_platform == "LinkedIn (Coming soon!)":
-            asyncio.run(self.scrape_linkedin())
-        else:
-            asyncio.run(self.main())
+        except ValueError:
+            self.status_label.setText("Run time and scroll interval must be whole numbers of seconds")
+            return
+
+        from scraper_engine import ScraperEngine
+        engine = ScraperEngine(
+            total_run_time,
+            scroll_interval,
+            urls=[self.twitter_url_input.text().strip()],
+            headless=False,  # Keep the window so users can log in, the profile remembers the session
+            adaptive=self.adaptive_checkbox.isChecked(),
+            indexer=self.live_indexer,
+        )
+        self.scraper_worker = ScraperWorker(engine, platform, self)
+        self.scraper_worker.status.connect(self.show_status)
+        self.scraper_worker.progress.connect(self.show_progress)
+        self.scraper_worker.failed.connect(lambda error: self.show_status(f"An error occurred: {error}"))
+        self.scraper_worker.finished.connect(self.scraper_finished)
+
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText("Scraper is running...")
+        self.scraper_worker.start()
+
+    def stop_scraper(self):
+        if self.scraper_worker is not None:
+            self.stop_button.setEnabled(False)
+            self.status_label.setText("Stopping scraper...")
+            self.scraper_worker.stop()
+
+    def scraper_finished(self):
+        self.scraper_worker.deleteLater()
+        self.scraper_worker = None
+        if not sip.isdeleted(self.start_button):
+            self.start_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
+
+    def show_status(self, text):
+        # The chat view replaces (and deletes) the scraper controls, updates go to the chat's status line meanwhile
+        label = self.chat_status_label if sip.isdeleted(self.status_label) else self.status_label
+        label.setText(text)
+
+    def show_progress(self, saved_count, tweets_per_second):
+        self.show_status(f"Saved {saved_count} tweets ({tweets_per_second:.2f} tweets/sec)")
 
     def new_function(self):
         self.status_label.setText("Database is creating...")
-        loader = TextLoader("tweets.txt")
-        documents = loader.load()
-        text_splitter = CharacterTextSplitter(chunk_size=2000, chunk_overlap=20)
-        docs = text_splitter.split_documents(documents)
-        embeddings = OpenAIEmbeddings(openai_api_key="sk-xxx")
-        db = FAISS.from_documents(docs, embeddings)
-        self.status_label.setText("Database is created")
-
-        def get_retrieval_response(prompt):
-            query = prompt
-            docs = db.similarity_search(query)
-            return docs
-
-        client = openai.OpenAI(api_key="sk-xxx")
+        from answer import AnswerPipeline
+        from answer_cache import AnswerCache
+        from api_client import get_client
+        from chat_index import TweetIndex
+        from conversation import ConversationMemory
+        from embedding_cache import CachedEmbeddings
+        from embeddings import get_embeddings
+        from live_index import LiveIndexer
+        from tweet_store import TweetStore
+
+        store = TweetStore()
+        store.import_legacy("tweets.txt")
+        if self.stopping_indexer is not None:
+            # The previous chat's indexer may still be adding and saving, the new index must open after its last save
+            self.stopping_indexer.join()
+            self.stopping_indexer = None
+        embeddings = CachedEmbeddings(get_embeddings())
+        tweet_index = TweetIndex(embeddings, store=store)
+        tweet_index.open()
+        self.status_label.setText(
+            f"Database is created (embedding cache hit rate {embeddings.hit_rate:.0%}, "
+            f"{tweet_index.dedup_stats['reduction']:.0%} duplicate tweets collapsed)"
+        )
+
+        client = get_client(api_key="sk-xxx")
+        pipeline = AnswerPipeline(
+            client, tweet_index, cache=AnswerCache(embeddings=embeddings), memory=ConversationMemory()
+        )
+
+        # Tweets scraped while the chat is open are embedded into the index as they arrive
+        self.live_index_signals = LiveIndexSignals()
+        self.live_index_signals.indexed.connect(self.show_live_indexed)
+        self.live_index_signals.failed.connect(lambda error: self.chat_status_label.setText(f"Indexing failed: {error}"))
+        self.live_indexer = LiveIndexer(
+            tweet_index, on_indexed=self.live_index_signals.indexed.emit, on_error=self.live_index_signals.failed.emit
+        )
+        self.live_indexer.start()
+        if self.scraper_worker is not None:
+            self.scraper_worker.engine.indexer = self.live_indexer
 
         def get_response(prompt):
-            completion = client.chat.completions.create(
-                model="gpt-3.5-turbo-0125",
-                messages=[
-                    {"role": "system", "content": "You are my helpful Twitter LLM (Large Language Model), your name is TLMM"},
-                    {"role": "user", "content": f"{prompt}"}
-                ]
-            )
-
-            if completion.choices[0].message.content!=None:
-                docs = get_retrieval_response(prompt)
-                completion = client.chat.completions.create(
-                    model="gpt-3.5-turbo-0125",
-                    messages=[
-                        {"role": "system", "content": "You are my helpful Twitter LLM (Large Language Model), your name is TLMM"},
-                        {"role": "user", "content": f"Use the following pieces of context to answer the user's question. If you can't find the answer in context, just say that you don't know, don't try to make up an answer. {prompt} in this context: {docs}."}
-                    ]
-                )
-
-            response_content = completion.choices[0].message.content
-            self.chat_history = []
-            # Update the chat history with system and user messages
-            self.chat_history.append(f"System: {response_content}\nUser: {prompt}\n\n")
-            self.chat_display.setPlainText("\n\n".join(self.chat_history))
+            if self.chat_worker is not None:
+                return
+            # The answer streams in on a worker thread, tokens are appended as they arrive
+            self.chat_display.setPlainText("\n\n".join(self.chat_history + [f"User: {prompt}\n\nSystem: "]))
+            self.chat_worker = ChatWorker(pipeline, prompt, self)
+            self.chat_worker.token.connect(self.append_chat_text)
+            self.chat_worker.answered.connect(lambda answer: self.chat_answered(prompt, answer, pipeline))
+            self.chat_worker.failed.connect(lambda error: self.chat_status_label.setText(f"An error occurred: {error}"))
+            self.chat_worker.finished.connect(self.chat_finished)
+            self.submit_button.setEnabled(False)
+            self.chat_status_label.setText("Thinking...")
+            self.chat_worker.start()
 
         # Create a new layout for the chat interface
         chat_layout = QVBoxLayout()
@@ -349,6 +322,10 @@ class SocialMediaScraperApp(QMainWindow):
 
         chat_layout.addWidget(self.chat_display)
 
+        # Latency of the last answer
+        self.chat_status_label = QLabel()
+        chat_layout.addWidget(self.chat_status_label)
+
         self.prompt_input = QLineEdit()
         self.prompt_input.setPlaceholderText("Enter your prompt here...")
         self.prompt_input.clear()
@@ -373,9 +350,46 @@ class SocialMediaScraperApp(QMainWindow):
         self.setCentralWidget(chat_widget)
 
         # Initialize chat history
-        self.chat_history = ""
+        self.chat_history = []
+
+    def append_chat_text(self, text):
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.chat_display.setTextCursor(cursor)
+
+    def chat_answered(self, prompt, answer, pipeline):
+        self.chat_history.append(f"User: {prompt}\n\nSystem: {answer}")
+        if 'cache' in pipeline.timings:
+            self.chat_status_label.setText(f"Answered from cache in {pipeline.timings['cache'] * 1000:.1f}ms")
+        else:
+            self.chat_status_label.setText(f"Answered in {pipeline.describe_timings()}")
+
+    def chat_finished(self):
+        self.chat_worker.deleteLater()
+        self.chat_worker = None
+        self.submit_button.setEnabled(True)
+
+    def show_live_indexed(self, added, lag):
+        if self.chat_worker is None:
+            self.chat_status_label.setText(f"Indexed {added} new tweets {lag:.1f}s after they were scraped")
 
     def end_function(self):
+        if self.live_indexer is not None:
+            # Queued tweets are still indexed and the index saved, on the indexer's own thread
+            if self.scraper_worker is not None:
+                self.scraper_worker.engine.indexer = None
+            self.live_index_signals.indexed.disconnect()
+            self.live_index_signals.failed.disconnect()
+            self.live_indexer.stop(wait=False)
+            self.stopping_indexer = self.live_indexer
+            self.live_indexer = None
+        if self.chat_worker is not None:
+            # Let a streaming answer finish quietly, the widgets it writes to are about to be deleted
+            for signal in (self.chat_worker.token, self.chat_worker.answered, self.chat_worker.failed, self.chat_worker.finished):
+                signal.disconnect()
+            self.chat_worker.finished.connect(self.chat_worker.deleteLater)
+            self.chat_worker = None
         # Recreate the original layout
         self.recreate_original_layout()
 
@@ -423,6 +437,11 @@ class SocialMediaScraperApp(QMainWindow):
         self.scroll_interval_input.setPlaceholderText("Scroll interval (seconds)")
         inputs_layout.addWidget(self.scroll_interval_input)
 
+        # The scroll interval is a starting point, shortened while tweets keep coming and lengthened on slow loads
+        self.adaptive_checkbox = QCheckBox("Adapt scroll interval to the feed")
+        self.adaptive_checkbox.setChecked(True)
+        inputs_layout.addWidget(self.adaptive_checkbox)
+
         # URL input for Twitter
         self.twitter_url_input = QLineEdit()
         self.twitter_url_input.setPlaceholderText("Twitter URL")
@@ -439,6 +458,14 @@ class SocialMediaScraperApp(QMainWindow):
         self.start_button.clicked.connect(self.start_scraper)
         main_layout.addWidget(self.start_button)
 
+        self.stop_button = QPushButton("Stop Scraper")
+        self.stop_button.clicked.connect(self.stop_scraper)
+        main_layout.addWidget(self.stop_button)
+
+        # A scrape may still be running in the background while the chat was open
+        self.start_button.setEnabled(self.scraper_worker is None)
+        self.stop_button.setEnabled(self.scraper_worker is not None)
+
         # New button for new actions
         self.new_button = QPushButton("Chat with Data")
         self.new_button.clicked.connect(self.new_function)
@@ -0,0 +1,76 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPE = os.environ.get('TWEET_INDEX', 'flat')
+INDEX_TYPES = ('flat', 'hnsw', 'ivf', 'ivfpq')
+TRAINING_PER_LIST = 40  # faiss wants at least 39 training vectors per IVF list
+MAX_EF_SEARCH = 4096
+
+
+def pq_subquantizers(dim, limit=64):
+    # Largest divisor of the dimension up to `limit`, e.g. 1536 -> 64 bytes per vector instead of 6144
+    return max(m for m in range(1, min(dim, limit) + 1) if dim % m == 0)
+
+
+def factory_string(index_type, dim, nlist=1024, hnsw_m=32, pq_m=None):
+    if index_type == 'flat':
+        return 'Flat'
+    if index_type == 'hnsw':
+        return f"HNSW{hnsw_m}"
+    if index_type == 'ivf':
+        return f"IVF{nlist},Flat"
+    if index_type == 'ivfpq':
+        return f"IVF{nlist},PQ{pq_m or pq_subquantizers(dim)}x8"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def training_size(index_type, nlist=1024):
+    # Vectors needed before the index can be built, smaller collections stay in an exact flat index until then
+    if index_type in ('ivf', 'ivfpq'):
+        return max(TRAINING_PER_LIST * nlist, 256 * TRAINING_PER_LIST)
+    return 0
+
+
+def build_index(description, vectors, train_size=None, seed=0):
+    # Trains on a random sample of at most train_size vectors, then adds all of them
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], description)
+    if not index.is_trained:
+        sample = vectors
+        if train_size and len(vectors) > train_size:
+            sample = vectors[np.random.default_rng(seed).choice(len(vectors), train_size, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    return index
+
+
+def search_parameters(index, selector=None, nprobe=16, ef_search=64, selectivity=1.0):
+    # nprobe (IVF lists scanned) and efSearch (HNSW candidate list) trade recall for latency per query. A selector
+    # passing only `selectivity` of the vectors leaves that share of the candidates, so both grow by its inverse.
+    scale = 1 / max(selectivity, 1e-9)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=min(ivf.nlist, math.ceil(nprobe * scale)))
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=min(MAX_EF_SEARCH, math.ceil(ef_search * scale)))
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+
+def reconstruct(index, ids):
+    # Stored vectors by id (decoded, for PQ). IVF indexes need a direct map from ids to lists, built on first use.
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+
+def tune(index, nprobe=16, ef_search=64):
+    # Defaults for searches that don't pass parameters, such as FAISS.similarity_search
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
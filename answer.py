@@ -0,0 +1,112 @@
+import time
+
+from documents import format_context
+from retrieval import parse_query
+
+CHAT_MODEL = "gpt-3.5-turbo-0125"
+SYSTEM_PROMPT = "You are my helpful Twitter LLM (Large Language Model), your name is TLMM"
+GROUNDED_PROMPT = (
+    "Use the following pieces of context to answer the user's question. If you can't find the answer in context, "
+    "just say that you don't know, don't try to make up an answer. {prompt} in this context: {context}."
+)
+FOLLOW_UP_PROMPT = "Answer from the tweets quoted earlier in this conversation. {prompt}"
+NO_TWEETS_ANSWER = "There are no scraped tweets to answer from yet, run the scraper first."
+NO_MATCHES_ANSWER = "No tweets match those filters, try a different from:, since: or until:."
+
+
+class AnswerPipeline:
+    # Retrieval first, then a single grounded completion. Questions that can be settled locally (empty prompt,
+    # nothing indexed, an answer cached for the current index) never reach the API. With a ConversationMemory the
+    # recent turns go along with each question. Per-stage latencies of the last answer are kept in `timings`.
+    def __init__(self, client, tweet_index, model=CHAT_MODEL, k=5, cache=None, memory=None):
+        self.client = client
+        self.tweet_index = tweet_index
+        self.model = model
+        self.k = k
+        self.cache = cache
+        self.memory = memory
+        self.timings = {}
+
+    def query_vector(self, query):
+        # Embedded once per question, for both the answer cache's similarity lookup and the vector search
+        if not query.strip():
+            return None
+        return self.tweet_index.embeddings.embed_query(query)
+
+    def retrieve(self, prompt, vector=None):
+        query, filters = parse_query(prompt)
+        if vector is None:
+            vector = self.query_vector(query)
+        return self.tweet_index.search(query, k=self.k, vector=vector, **filters)
+
+    def user_message(self, prompt, documents):
+        if documents:
+            return GROUNDED_PROMPT.format(prompt=prompt, context=format_context(documents))
+        return FOLLOW_UP_PROMPT.format(prompt=prompt)
+
+    def build_messages(self, prompt, documents):
+        history = self.memory.messages() if self.memory is not None else []
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *history,
+            {"role": "user", "content": self.user_message(prompt, documents)},
+        ]
+
+    def stream(self, prompt):
+        # Yields the answer token by token, time to first token is the latency the user sees
+        self.timings = {}
+        start = time.perf_counter()
+        prompt = prompt.strip()
+        if not prompt:
+            return
+
+        # A follow-up depends on the turns before it, its answer is cached under the digest of those turns
+        context = self.memory.digest() if self.memory is not None else ''
+        query, filters = parse_query(prompt)
+        vector = None
+        if self.cache is not None:
+            # The exact key costs no embedding, the question is only embedded once that misses
+            cached = self.cache.exact(prompt, self.tweet_index.version, context)
+            if cached is None:
+                if self.cache.embeddings is not None:
+                    vector = self.query_vector(query)
+                cached = self.cache.similar(prompt, self.tweet_index.version, vector, context)
+            if cached is not None:
+                self.timings['cache'] = time.perf_counter() - start
+                if self.memory is not None:
+                    self.memory.add(prompt, prompt, cached, [])
+                yield cached
+                return
+
+        documents = self.retrieve(prompt, vector)
+        retrieved = time.perf_counter()
+        self.timings['retrieval'] = retrieved - start
+        if not documents:
+            self.timings['total'] = retrieved - start
+            # An index with tweets that the filters all ruled out is not an empty index
+            yield NO_MATCHES_ANSWER if filters and self.tweet_index.ntotal else NO_TWEETS_ANSWER
+            return
+        if self.memory is not None:
+            documents = self.memory.unseen(documents)
+
+        messages = self.build_messages(prompt, documents)
+        tokens = []
+        for token in self.client.stream_chat(messages, self.model):
+            if 'first_token' not in self.timings:
+                self.timings['first_token'] = time.perf_counter() - start
+            tokens.append(token)
+            yield token
+        finished = time.perf_counter()
+        self.timings['completion'] = finished - retrieved
+        self.timings['total'] = finished - start
+        answer = "".join(tokens)
+        if self.memory is not None:
+            self.memory.add(prompt, messages[-1]['content'], answer, documents)
+        if self.cache is not None and answer:
+            self.cache.put(prompt, self.tweet_index.version, answer, vector, context)
+
+    def answer(self, prompt):
+        return "".join(self.stream(prompt))
+
+    def describe_timings(self):
+        return ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
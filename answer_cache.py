@@ -0,0 +1,153 @@
+import array
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+CACHE_PATH = 'answer_cache.sqlite'
+WHITESPACE = re.compile(r'\s+')
+TRAILING_PUNCTUATION = re.compile(r'[\s?!.]+$')
+SENTENCE = re.compile(r'(?<=[.!?])\s+')
+WORD_PUNCTUATION = '.,;!?"()[]{}\''
+
+
+def normalize_prompt(prompt):
+    # "What is he saying about Tesla?" and "what is he saying about tesla" share an entry
+    return TRAILING_PUNCTUATION.sub('', WHITESPACE.sub(' ', prompt).strip().lower())
+
+
+def named_tokens(prompt):
+    # Hashtags, handles, filters, numbers and capitalised words past the start of a sentence: what a question is
+    # about. "What is he saying about Tesla" and "... SpaceX" embed almost alike but must not share an answer.
+    tokens = set()
+    for sentence in SENTENCE.split(prompt.strip()):
+        for position, word in enumerate(sentence.split()):
+            word = word.strip(WORD_PUNCTUATION)
+            if (
+                word.startswith(('#', '@')) or ':' in word or any(character.isdigit() for character in word)
+                or (position and word[:1].isupper() and word != 'I')
+            ):
+                tokens.add(word.lower())
+    return ' '.join(sorted(tokens))
+
+
+class AnswerCache:
+    # Answers keyed by sha256(index version, conversation context, normalised prompt) in SQLite, where the context
+    # is the digest of the turns remembered before the question ('' for an opening question). exact() needs no
+    # embedding; with `embeddings` set, similar() falls back to the closest cached question of the same index
+    # version and context with the same named_tokens when its cosine similarity reaches `similarity`. Callers that
+    # already embedded the question pass its vector to similar and put. Entries expire after `ttl` seconds, the least
+    # recently used go first past max_entries, and answers from an older index version are dropped as soon as one
+    # for a newer version is stored.
+    def __init__(self, path=CACHE_PATH, ttl=7 * 24 * 3600, max_entries=1000, embeddings=None, similarity=0.95):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+        self.similarity = similarity
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, version TEXT NOT NULL, prompt TEXT NOT NULL, '
+            'vector BLOB, answer TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, entities TEXT, '
+            "context TEXT NOT NULL DEFAULT '')"
+        )
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(answers)')]
+        if 'entities' not in columns:
+            # Older caches hold no named tokens, their answers are only reused for the exact question
+            self.connection.execute('ALTER TABLE answers ADD COLUMN entities TEXT')
+        if 'context' not in columns:
+            # Older answers were all saved for opening questions
+            self.connection.execute("ALTER TABLE answers ADD COLUMN context TEXT NOT NULL DEFAULT ''")
+        self.connection.execute('CREATE INDEX IF NOT EXISTS answers_version ON answers (version)')
+        self.connection.commit()
+
+    def key(self, prompt, version, context=''):
+        scope = f"{version}\0{context}" if context else version
+        return hashlib.sha256(f"{scope}\0{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+    def query_vector(self, prompt, vector=None):
+        if vector is None:
+            vector = self.embeddings.embed_query(normalize_prompt(prompt))
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def closest(self, vector, version, cutoff, entities, context):
+        rows = self.connection.execute(
+            'SELECT key, vector, answer FROM answers '
+            'WHERE version = ? AND created >= ? AND vector IS NOT NULL AND entities = ? AND context = ?',
+            (version, cutoff, entities, context),
+        ).fetchall()
+        if not rows:
+            return None
+        matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        return rows[best][0], rows[best][2]
+
+    def use(self, found, now, miss=True):
+        # Counts the lookup and refreshes last_used of a hit; with miss=False a miss is left for similar() to count
+        with self.lock:
+            if found is None:
+                self.misses += miss
+                return None
+            self.hits += 1
+            self.connection.execute('UPDATE answers SET last_used = ? WHERE key = ?', (now, found[0]))
+            self.connection.commit()
+        return found[1]
+
+    def exact(self, prompt, version, context=''):
+        key = self.key(prompt, version, context)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT answer FROM answers WHERE key = ? AND created >= ?', (key, now - self.ttl)
+            ).fetchone()
+        return self.use((key, row[0]) if row else None, now, miss=False)
+
+    def similar(self, prompt, version, vector=None, context=''):
+        # Only after exact() missed; without embeddings it just counts the miss
+        now = time.time()
+        found = None
+        if self.embeddings is not None:
+            # Embedded outside the lock, the backend may be a network call
+            vector = self.query_vector(prompt, vector)
+            with self.lock:
+                found = self.closest(vector, version, now - self.ttl, named_tokens(prompt), context)
+        return self.use(found, now)
+
+    def get(self, prompt, version, vector=None, context=''):
+        answer = self.exact(prompt, version, context)
+        if answer is None:
+            answer = self.similar(prompt, version, vector, context)
+        return answer
+
+    def put(self, prompt, version, answer, vector=None, context=''):
+        vector_blob = None
+        if self.embeddings is not None:
+            vector_blob = array.array('f', self.query_vector(prompt, vector).tolist()).tobytes()
+        now = time.time()
+        with self.lock:
+            self.connection.execute('DELETE FROM answers WHERE version != ? OR created < ?', (version, now - self.ttl))
+            self.connection.execute(
+                'INSERT OR REPLACE INTO answers '
+                '(key, version, prompt, vector, answer, created, last_used, entities, context) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    self.key(prompt, version, context), version, normalize_prompt(prompt), vector_blob, answer, now,
+                    now, named_tokens(prompt), context,
+                ),
+            )
+            (count,) = self.connection.execute('SELECT COUNT(*) FROM answers').fetchone()
+            if count > self.max_entries:
+                self.connection.execute(
+                    'DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used LIMIT ?)',
+                    (count - self.max_entries,),
+                )
+            self.connection.commit()
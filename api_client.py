@@ -0,0 +1,227 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+
+import httpx
+import openai
+
+from documents import count_tokens
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+_DONE = object()
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class TokenBucket:
+    # Refills `rate` units per second up to `capacity`, acquire waits until enough have accumulated. Create it on the
+    # event loop that acquires from it
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        # A request bigger than the bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class ApiClient:
+    # One AsyncOpenAI client with a pooled HTTP connection set, running on its own event loop thread so the GUI,
+    # index builds and QThread workers can all share it. Every request passes a requests/minute and a
+    # tokens/minute bucket and is retried with exponential backoff and full jitter on 429s, 5xx and connection
+    # errors; a 429 pauses all requests for its Retry-After. Embedding calls made within coalesce_delay of each
+    # other are merged into requests of up to max_batch inputs, identical texts in flight are sent once.
+    def __init__(self, api_key="sk-xxx", base_url=None, max_concurrency=8, requests_per_minute=3000,
+                 tokens_per_minute=1000000, max_retries=6, base_backoff=0.5, max_backoff=20.0, max_batch=512,
+                 coalesce_delay=0.01, timeout=60.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_batch = max_batch
+        self.coalesce_delay = coalesce_delay
+        self.paused_until = 0.0
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0}
+        self.pending = {}
+        self.queued = []
+        self.flush_handle = None
+
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                timeout=timeout,
+            ),
+        )
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='api-client', daemon=True)
+        self.thread.start()
+        self.run(self.create_limits(requests_per_minute, tokens_per_minute))
+
+    async def create_limits(self, requests_per_minute, tokens_per_minute):
+        # asyncio primitives bind to the loop current when they are created before Python 3.10, so they are made
+        # on the client's own loop rather than on the thread that constructs the client
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(1, requests_per_minute // 60))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def request(self, call, tokens=1):
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire()
+            await self.tokens.acquire(tokens)
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            try:
+                async with self.semaphore:
+                    self.stats['requests'] += 1
+                    return await call()
+            except RETRYABLE_ERRORS as error:
+                if attempt == self.max_retries:
+                    raise
+                self.stats['retries'] += 1
+                delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+                if isinstance(error, openai.RateLimitError):
+                    self.stats['rate_limited'] += 1
+                    delay += retry_after(error) or 0.0
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                await asyncio.sleep(delay)
+
+    async def aembed(self, texts, model):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            key = (model, text)
+            future = self.pending.get(key)
+            if future is None:
+                future = loop.create_future()
+                self.pending[key] = future
+                self.queued.append(key)
+            futures.append(future)
+        if len(self.queued) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.coalesce_delay, self.flush)
+        return await asyncio.gather(*futures)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        queued, self.queued = self.queued, []
+        by_model = {}
+        for model, text in queued:
+            by_model.setdefault(model, []).append(text)
+        for model, texts in by_model.items():
+            for start in range(0, len(texts), self.max_batch):
+                asyncio.ensure_future(self.send_embeddings(model, texts[start:start + self.max_batch]))
+
+    async def send_embeddings(self, model, texts):
+        futures = [self.pending.pop((model, text)) for text in texts]
+        try:
+            response = await self.request(
+                lambda: self.client.embeddings.create(model=model, input=texts),
+                sum(count_tokens(text) for text in texts),
+            )
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, item in zip(futures, sorted(response.data, key=lambda item: item.index)):
+            if not future.done():
+                future.set_result(item.embedding)
+
+    async def acomplete(self, messages, model):
+        response = await self.request(
+            lambda: self.client.chat.completions.create(model=model, messages=messages),
+            sum(count_tokens(message['content']) for message in messages),
+        )
+        return response.choices[0].message.content or ""
+
+    async def astream_chat(self, messages, model):
+        # Only opening the stream is retried, once tokens have been handed out a failure is raised
+        chunks = await self.request(
+            lambda: self.client.chat.completions.create(model=model, messages=messages, stream=True),
+            sum(count_tokens(message['content']) for message in messages),
+        )
+        async for chunk in chunks:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                yield token
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def embed(self, texts, model):
+        return self.run(self.aembed(list(texts), model))
+
+    def complete(self, messages, model):
+        return self.run(self.acomplete(messages, model))
+
+    def stream_chat(self, messages, model):
+        # Blocking generator over the async stream, for callers on plain threads such as the chat worker
+        tokens = queue.Queue()
+
+        async def pump():
+            try:
+                async for token in self.astream_chat(messages, model):
+                    tokens.put(token)
+            except Exception as error:
+                tokens.put(error)
+            finally:
+                tokens.put(_DONE)
+
+        pumping = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                token = tokens.get()
+                if token is _DONE:
+                    break
+                if isinstance(token, Exception):
+                    raise token
+                yield token
+        finally:
+            pumping.cancel()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def get_client(api_key="sk-xxx", base_url=None, **options):
+    # One client (and connection pool) per API key and endpoint for the whole process
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = ApiClient(api_key, base_url, **options)
+            _clients[(api_key, base_url)] = client
+        return client
@@ -1,13 +1,13 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox
 from PyQt5.QtGui import QPixmap, QIcon, QFont
 from PyQt5 import QtCore
-from pymongo import MongoClient
 import os
 
-# Importing SocialMediaScraperApp and SocialMediaScraperApp_WOUT from MAIN_UI and MAIN_UI_CHAT
-from MAIN_UI import SocialMediaScraperApp_WOUT
-from MAIN_UI_CHAT import SocialMediaScraperApp
+from auth_service import AuthService
+from warmup import CHAT_MODULES, SCRAPER_MODULES, WARM_UP, warm_up
+from workers import SignInWorker
 
 basedir = os.path.dirname(__file__)
 
@@ -19,8 +19,10 @@ except ImportError:
     pass
 
 class SignInApp(QWidget):
-    def __init__(self):
+    def __init__(self, auth):
         super().__init__()
+        self.auth = auth
+        self.signin_worker = None
         self.setWindowTitle("Sign In")
         self.setWindowIcon(QIcon(os.path.join(basedir, 'logo.png')))  # Setting the window icon
         self.setStyleSheet("background-color: #E0FFFF;")  # Setting light blue background
@@ -65,33 +67,52 @@ class SignInApp(QWidget):
         self.password_edit.returnPressed.connect(self.signin)
 
     def signin(self):
+        if self.signin_worker is not None:
+            return
         username = self.username_edit.text()
         password = self.password_edit.text()
 
-        # Connect to MongoDB
-        try:
-            client = MongoClient("mongodb+srv://yourprofile@database1.xxxx.mongodb.net/")
-            db = client.smartbids
-            users_collection = db.users
-            user = users_collection.find_one({"username": username, "password": password})
-
-            if user:
-                # Check if the user is a free user
-                if user.get("subscription_status") == "free":
-                    self.hide()
-                    self.user_features_window = SocialMediaScraperApp_WOUT()
-                    self.user_features_window.show()
-                else:
-                    self.hide()
-                    self.user_features_window = SocialMediaScraperApp()
-                    self.user_features_window.show()
-            else:
-                QMessageBox.warning(self, "Sign In Failed", "Invalid username or password.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
+        # The MongoDB lookup runs on a worker thread so the window stays responsive
+        self.signin_worker = SignInWorker(self.auth, username, password, self)
+        self.signin_worker.signed_in.connect(self.signed_in)
+        self.signin_worker.failed.connect(
+            lambda error: QMessageBox.critical(self, "Error", f"An error occurred: {error}")
+        )
+        self.signin_worker.finished.connect(self.signin_finished)
+        self.signin_button.setEnabled(False)
+        self.signin_worker.start()
+
+    def signin_finished(self):
+        self.signin_worker = None
+        self.signin_button.setEnabled(True)
+
+    def signed_in(self, user):
+        if user is None:
+            QMessageBox.warning(self, "Sign In Failed", "Invalid username or password.")
+            return
+
+        # Check if the user is a free user
+        # The windows are imported here so the sign-in window does not wait for them
+        if user.get("subscription_status") == "free":
+            from MAIN_UI import SocialMediaScraperApp_WOUT
+            self.hide()
+            self.user_features_window = SocialMediaScraperApp_WOUT()
+            self.user_features_window.show()
+            modules = SCRAPER_MODULES
+        else:
+            from MAIN_UI_CHAT import SocialMediaScraperApp
+            self.hide()
+            self.user_features_window = SocialMediaScraperApp()
+            self.user_features_window.show()
+            modules = SCRAPER_MODULES + CHAT_MODULES
+        if WARM_UP:
+            warm_up(modules)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # the text normaliser's worker processes start from a frozen build too
     app = QApplication(sys.argv)
-    signin_app = SignInApp()
+    auth = AuthService()
+    auth.warm_up()  # DNS, TLS and the connection pool are ready by the time the user has typed their password
+    signin_app = SignInApp(auth)
     signin_app.show()
     sys.exit(app.exec_())
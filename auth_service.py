@@ -0,0 +1,69 @@
+import hmac
+import os
+import threading
+
+MONGO_URI = os.environ.get('TWEET_MONGO_URI', "mongodb+srv://yourprofile@database1.xxxx.mongodb.net/")
+DATABASE = 'smartbids'
+USER_FIELDS = {'_id': 0, 'username': 1, 'password': 1, 'subscription_status': 1}
+
+
+class AuthService:
+    # Sign-in against the users collection through one pooled MongoClient for the whole process. warm_up() resolves
+    # the SRV record and opens the TLS connection on a background thread at launch, so a sign-in only pays for the
+    # query. Users are looked up by username alone and the password is compared locally; the lookup relies on an
+    # index on `username`, which belongs to the database's setup (see the README), the app never creates it.
+    def __init__(self, client=None, uri=MONGO_URI, database=DATABASE, max_pool_size=4):
+        self.uri = uri
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.client = client
+        self.lock = threading.Lock()
+        self.username_indexed = None
+
+    def get_client(self):
+        with self.lock:
+            if self.client is None:
+                from pymongo import MongoClient
+
+                self.client = MongoClient(
+                    self.uri, maxPoolSize=self.max_pool_size, minPoolSize=1, serverSelectionTimeoutMS=10000,
+                )
+            return self.client
+
+    @property
+    def users(self):
+        return self.get_client()[self.database].users
+
+    def warm_up(self):
+        def run():
+            try:
+                self.get_client().admin.command('ping')
+                self.username_indexed = self.has_username_index()
+            except Exception:
+                pass  # sign-in connects again and reports the error
+
+        thread = threading.Thread(target=run, name='auth-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def has_username_index(self):
+        # None when the account may not list indexes
+        from pymongo.errors import OperationFailure
+
+        try:
+            indexes = self.users.index_information().values()
+        except OperationFailure:
+            return None
+        return any(index['key'][0][0] == 'username' for index in indexes)
+
+    def login(self, username, password):
+        # Returns the user (username, subscription_status) or None for a wrong username or password.
+        # Blocks on the network, call it off the GUI thread.
+        if not username or not password:
+            return None
+        user = self.users.find_one({'username': username}, USER_FIELDS)
+        stored = str(user.get('password', '')) if user is not None else ''
+        if user is None or not hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')):
+            return None
+        del user['password']
+        return user
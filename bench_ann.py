@@ -0,0 +1,70 @@
+import argparse
+import random
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import build_index, factory_string, search_parameters, training_size
+from bench_fixtures import tweet_text
+from embeddings import HashingEmbeddings
+
+
+def synthetic_vectors(encoder, count, seed):
+    rng = random.Random(seed)
+    return encoder.encode([tweet_text(i, rng) for i in range(count)])
+
+
+def percentile(values, q):
+    return float(np.percentile(np.asarray(values) * 1000, q))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build time, size, query latency and recall@k of each FAISS index type")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--types', nargs='+', default=['flat', 'hnsw', 'ivf', 'ivfpq'])
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--nlist', type=int, default=1024)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[64, 256])
+    args = parser.parse_args(argv)
+
+    encoder = HashingEmbeddings(n_features=args.dim)
+    queries = synthetic_vectors(encoder, args.queries, seed=1)
+    for size in args.sizes:
+        vectors = synthetic_vectors(encoder, size, seed=0)
+        print(f"\n{size} synthetic tweets, {args.dim} dimensions")
+        print(f"{'index':>6} {'knob':>13} {'build s':>8} {'MB':>8} {'p50 ms':>7} {'p99 ms':>7} {f'recall@{args.k}':>10}")
+        # Synthetic tweets share a small vocabulary and tie often, so a hit is any result as close as the exact k-th
+        kth_distance = faiss.knn(queries, vectors, args.k)[0][:, -1] * (1 + 1e-5) + 1e-6
+        for index_type in args.types:
+            description = factory_string(index_type, args.dim, nlist=args.nlist)
+            start = time.perf_counter()
+            index = build_index(description, vectors, training_size(index_type, args.nlist))
+            build = time.perf_counter() - start
+            megabytes = len(faiss.serialize_index(index)) / 1e6
+
+            if index_type in ('ivf', 'ivfpq'):
+                knobs = [(f"nprobe={nprobe}", {'nprobe': nprobe}) for nprobe in args.nprobe]
+            elif index_type == 'hnsw':
+                knobs = [(f"efSearch={ef}", {'ef_search': ef}) for ef in args.ef_search]
+            else:
+                knobs = [('exact', {})]
+            for knob, settings in knobs:
+                params = search_parameters(index, **settings)
+                latencies, hits = [], 0
+                for query, limit in zip(queries, kth_distance):
+                    start = time.perf_counter()
+                    _, positions = index.search(query[None, :], args.k, params=params)
+                    latencies.append(time.perf_counter() - start)
+                    found = positions[0][positions[0] >= 0]
+                    hits += int((((vectors[found] - query) ** 2).sum(axis=1) <= limit).sum())
+                recall = hits / (len(queries) * args.k)
+                print(f"{index_type:>6} {knob:>13} {build:>8.1f} {megabytes:>8.1f} {percentile(latencies, 50):>7.2f} "
+                      f"{percentile(latencies, 99):>7.2f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
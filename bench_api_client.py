@@ -0,0 +1,75 @@
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from api_client import ApiClient
+from bench_fixtures import MockOpenAIHandler, fixture_server, tweet_text
+from embeddings import OPENAI_EMBEDDING_MODEL
+
+
+def reset_counts():
+    for name in MockOpenAIHandler.counts:
+        MockOpenAIHandler.counts[name] = 0
+
+
+def sequential_build(base_url, texts, batch_size):
+    # What LangChain's OpenAIEmbeddings does: one synchronous request per batch, the SDK's default retries
+    client = openai.OpenAI(api_key="sk-mock", base_url=base_url)
+    failed = 0
+    for start in range(0, len(texts), batch_size):
+        try:
+            client.embeddings.create(model=OPENAI_EMBEDDING_MODEL, input=texts[start:start + batch_size])
+        except openai.RateLimitError:
+            failed += 1
+    return failed
+
+
+def report(name, texts, elapsed, failed=0):
+    counts = MockOpenAIHandler.counts
+    print(f"{name:>22} {elapsed:>8.2f} {texts / elapsed:>10.0f} {counts['requests']:>9} "
+          f"{counts['rate_limited']:>6} {failed:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embedding throughput against a local OpenAI stub that returns 429s")
+    parser.add_argument('--texts', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.2)
+    parser.add_argument('--embedding-delay', type=float, default=0.2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    texts = [tweet_text(i, rng) for i in range(args.texts)]
+    MockOpenAIHandler.rate_limit_ratio = args.rate_limit_ratio
+    MockOpenAIHandler.embedding_delay = args.embedding_delay
+    with fixture_server(MockOpenAIHandler) as base_url:
+        base_url += "/v1"
+        print(f"{args.rate_limit_ratio:.0%} of requests rejected with 429, {args.embedding_delay}s per request")
+        print(f"{'':>22} {'seconds':>8} {'texts/sec':>10} {'requests':>9} {'429s':>6} {'failed':>7}")
+
+        reset_counts()
+        start = time.perf_counter()
+        failed = sequential_build(base_url, texts, 1000)
+        report('sequential build', len(texts), time.perf_counter() - start, failed)
+
+        client = ApiClient(api_key="sk-mock", base_url=base_url, max_concurrency=args.concurrency, base_backoff=0.1)
+        reset_counts()
+        start = time.perf_counter()
+        client.embed(texts, OPENAI_EMBEDDING_MODEL)
+        report('pooled client build', len(texts), time.perf_counter() - start)
+
+        # Queries from many threads at once, each would be its own request without coalescing
+        reset_counts()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(32) as executor:
+            list(executor.map(lambda text: client.embed([text], OPENAI_EMBEDDING_MODEL), texts[:args.queries]))
+        report('coalesced queries', args.queries, time.perf_counter() - start)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import random
+import statistics
+import time
+
+from auth_service import DATABASE, AuthService
+
+_mock_servers = {}
+
+
+def make_client(uri):
+    # A local mongod when a uri is given, else an in-memory mongomock server shared by every client in the process
+    if uri:
+        from pymongo import MongoClient
+
+        return MongoClient(uri)
+    import mongomock
+    from mongomock.store import ServerStore
+
+    return mongomock.MongoClient(_store=_mock_servers.setdefault('default', ServerStore()))
+
+
+def seed(uri, count):
+    # The username index is part of the database's setup, created here the way an administrator would
+    users = make_client(uri)[DATABASE].users
+    users.drop()
+    users.insert_many(
+        {'username': f"user{i}", 'password': f"password{i}", 'subscription_status': 'free' if i % 2 else 'paid'}
+        for i in range(count)
+    )
+    users.create_index('username', unique=True)
+
+
+def client_per_login(uri, username, password):
+    # The sign-in before the auth service: a new client and a username + password query on every click
+    client = make_client(uri)
+    try:
+        return client[DATABASE].users.find_one({'username': username, 'password': password})
+    finally:
+        client.close()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def measure(login, logins, users, seed_value=0):
+    rng = random.Random(seed_value)
+    samples = []
+    for _ in range(logins):
+        i = rng.randrange(users)
+        start = time.perf_counter()
+        assert login(f"user{i}", f"password{i}")
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sign-in latency: client per login vs the pooled auth service")
+    parser.add_argument('--uri', help="a local mongod, e.g. mongodb://localhost:27017 (default: mongomock)")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    seed(args.uri, args.users)
+    start = time.perf_counter()
+    auth = AuthService(make_client(args.uri))
+    auth.warm_up().join()
+    warm_up = time.perf_counter() - start
+
+    print(f"{args.users} users in {'mongod' if args.uri else 'mongomock'}, warm-up {warm_up * 1000:.1f}ms, "
+          f"username index found: {auth.username_indexed}")
+    print(f"{'sign-in':>18} {'p50 ms':>8} {'p99 ms':>8}")
+    runs = (
+        ('client per login', lambda username, password: client_per_login(args.uri, username, password)),
+        ('pooled, indexed', auth.login),
+    )
+    for name, login in runs:
+        p50, p99 = measure(login, args.logins, args.users)
+        print(f"{name:>18} {p50:>8.2f} {p99:>8.2f}")
+    if auth.login('user0', 'wrong') is not None or auth.login('nobody', 'password0') is not None:
+        raise SystemExit("a wrong username or password signed in")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from playwright.async_api import async_playwright
+
+from bench_fixtures import fixture_server
+from browser_profile import close_scraping_context, open_scraping_context
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def browser_rss_mb():
+    # Resident memory of every Chromium process started by this benchmark
+    if psutil is None:
+        return None
+    children = psutil.Process(os.getpid()).children(recursive=True)
+    total = 0
+    for child in children:
+        try:
+            total += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total / (1024 * 1024)
+
+
+async def load_pages(base_url, pages, scrolls, headless, block_resources, user_data_dir):
+    async with async_playwright() as p:
+        if block_resources is None:
+            # The old setup: a plain headful-style launch with every resource loaded
+            browser = await p.chromium.launch(headless=headless)
+            context = await browser.new_context()
+        else:
+            context = await open_scraping_context(p, headless=headless, user_data_dir=user_data_dir, block_resources=block_resources)
+        page = await context.new_page()
+        peak_rss = None
+        start = time.perf_counter()
+        for i in range(pages):
+            await page.goto(f"{base_url}/timeline/{i}")
+            await page.wait_for_selector('article div[lang]')
+            for _ in range(scrolls):
+                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+                await page.wait_for_load_state('networkidle')
+            rss = browser_rss_mb()
+            if rss is not None:
+                peak_rss = max(peak_rss or 0, rss)
+        elapsed = time.perf_counter() - start
+        await close_scraping_context(context)
+    return pages / elapsed * 60, peak_rss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pages/min and browser RSS with and without the lightweight scraping profile")
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--scrolls', type=int, default=5)
+    parser.add_argument('--headed', action='store_true', help="Run the baseline with a visible window like the old GUI")
+    args = parser.parse_args(argv)
+
+    with fixture_server() as base_url, tempfile.TemporaryDirectory() as profile_dir:
+        setups = [
+            ("baseline", dict(headless=not args.headed, block_resources=None, user_data_dir=None)),
+            ("blocking", dict(headless=True, block_resources=True, user_data_dir=None)),
+            ("blocking + profile", dict(headless=True, block_resources=True, user_data_dir=profile_dir)),
+        ]
+        print(f"{'setup':>20} {'pages/min':>10} {'peak RSS MB':>12}")
+        for name, options in setups:
+            pages_per_minute, peak_rss = asyncio.run(load_pages(base_url, args.pages, args.scrolls, **options))
+            rss = f"{peak_rss:.0f}" if peak_rss is not None else "n/a"
+            print(f"{name:>20} {pages_per_minute:>10.1f} {rss:>12}")
+        if psutil is None:
+            print("Install psutil to measure RSS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from answer import AnswerPipeline
+from answer_cache import AnswerCache
+from api_client import ApiClient
+from bench_fixtures import MockOpenAIHandler, fixture_server, tweet_text
+from chat_index import TweetIndex
+from embeddings import HashingEmbeddings
+from tweet_store import TweetStore
+
+
+def build_index(directory, tweets):
+    rng = random.Random(0)
+    store = TweetStore(f"{directory}/store")
+    store.append_records([{'id': str(i), 'author': f"user{i % 13}", 'text': tweet_text(i, rng)} for i in range(tweets)])
+    tweet_index = TweetIndex(HashingEmbeddings(), f"{directory}/index", store)
+    tweet_index.open()
+    return tweet_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time to first token vs full answer against a local mock OpenAI server")
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--tweets', type=int, default=2000)
+    parser.add_argument('--first-token-delay', type=float, default=0.5)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    MockOpenAIHandler.first_token_delay = args.first_token_delay
+    MockOpenAIHandler.token_delay = args.token_delay
+    with fixture_server(MockOpenAIHandler) as base_url, tempfile.TemporaryDirectory() as directory:
+        client = ApiClient(api_key="sk-mock", base_url=f"{base_url}/v1")
+        pipeline = AnswerPipeline(client, build_index(directory, args.tweets))
+
+        question = "what is he saying about tesla?"
+        streamed_totals, first_tokens, blocking_totals = [], [], []
+        for _ in range(args.questions):
+            start = time.perf_counter()
+            pipeline.answer(question)
+            streamed_totals.append(time.perf_counter() - start)
+            first_tokens.append(pipeline.timings['first_token'])
+
+            # The same question without streaming, the user waits for the whole completion
+            start = time.perf_counter()
+            messages = pipeline.build_messages(question, pipeline.retrieve(question))
+            client.complete(messages, pipeline.model)
+            blocking_totals.append(time.perf_counter() - start)
+
+        print(f"blocking answer, visible after: {statistics.median(blocking_totals):.3f}s")
+        print(f"streamed answer, first token:   {statistics.median(first_tokens):.3f}s")
+        print(f"streamed answer, complete:      {statistics.median(streamed_totals):.3f}s")
+
+        pipeline.cache = AnswerCache(f"{directory}/answer_cache.sqlite", embeddings=pipeline.tweet_index.embeddings)
+        pipeline.answer(question)
+        cached_totals = []
+        for _ in range(args.questions):
+            start = time.perf_counter()
+            pipeline.answer("What is he saying about Tesla")
+            cached_totals.append(time.perf_counter() - start)
+        print(f"cached answer, complete:        {statistics.median(cached_totals) * 1000:.1f}ms")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+
+from bench_fixtures import tweet_text
+from dedup import Deduplicator
+
+
+def synthetic_records(count, duplicate_ratio, seed=0):
+    # Originals plus retweets, repeated snapshots with a different link, and copies with one word changed.
+    # `cluster` is the original each record was made from, the ground truth for the clustering.
+    rng = random.Random(seed)
+    records, originals = [], []
+    for i in range(count):
+        if originals and rng.random() < duplicate_ratio:
+            source = rng.choice(originals)
+            text = records[source]['text']
+            kind = rng.randrange(3)
+            if kind == 0:
+                text = f"RT @user{rng.randrange(100)}: {text}"
+            elif kind == 1:
+                text = f"{text} https://t.co/{rng.randrange(16 ** 8):08x}"
+            else:
+                words = text.split()
+                words[rng.randrange(len(words))] = rng.choice(['wow', 'great', 'news'])
+                text = ' '.join(words)
+            records.append({'id': str(i), 'text': text, 'cluster': source})
+        else:
+            words = ' '.join(tweet_text(i, rng).split() + tweet_text(i + count, rng).split())
+            records.append({'id': str(i), 'text': words, 'cluster': i})
+            originals.append(i)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate collapsing: time, reduction and accuracy")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--duplicate-ratio', type=float, default=0.4)
+    parser.add_argument('--threshold', type=float, default=0.7)
+    args = parser.parse_args(argv)
+
+    print(f"{'tweets':>8} {'seconds':>8} {'tweets/sec':>11} {'kept':>8} {'reduction':>10} {'expected':>9} {'wrong':>6}")
+    for size in args.sizes:
+        records = synthetic_records(size, args.duplicate_ratio)
+        deduplicator = Deduplicator(threshold=args.threshold)
+        start = time.perf_counter()
+        kept, stats = deduplicator.collapse(records)
+        elapsed = time.perf_counter() - start
+        expected = len({record['cluster'] for record in records})
+        # Records merged into a cluster that started from a different original
+        roots = deduplicator.clusters([record['text'] for record in records])
+        wrong = sum(records[root]['cluster'] != record['cluster'] for root, record in zip(roots, records))
+        print(f"{size:>8} {elapsed:>8.2f} {size / elapsed:>11.0f} {stats['kept']:>8} "
+              f"{stats['reduction']:>10.1%} {1 - expected / size:>9.1%} {wrong:>6}")
+
+
+if __name__ == "__main__":
+    main()
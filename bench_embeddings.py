@@ -0,0 +1,43 @@
+import argparse
+import os
+import random
+import time
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from bench_fixtures import WORDS, tweet_text
+from embeddings import get_embeddings
+
+
+def synthetic_documents(count, seed=0):
+    rng = random.Random(seed)
+    return [Document(page_content=tweet_text(i, rng), metadata={'id': str(i)}) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Docs/sec of a FAISS index build with each embedding backend")
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--backends', nargs='+', default=['hashing', 'local', 'openai'])
+    args = parser.parse_args(argv)
+
+    documents = synthetic_documents(args.docs)
+    print(f"{len(documents)} synthetic tweets over a {len(WORDS)} word vocabulary")
+    print(f"{'backend':>10} {'seconds':>8} {'docs/sec':>10}")
+    for backend in args.backends:
+        if backend == 'openai' and not os.environ.get('OPENAI_API_KEY'):
+            print(f"{backend:>10} skipped, set OPENAI_API_KEY to include it")
+            continue
+        try:
+            embeddings = get_embeddings(backend, api_key=os.environ.get('OPENAI_API_KEY'))
+        except ImportError as e:
+            print(f"{backend:>10} skipped, {e}")
+            continue
+        start = time.perf_counter()
+        FAISS.from_documents(documents, embeddings)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:>10} {elapsed:>8.2f} {len(documents) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from playwright.async_api import async_playwright
+
+from bench_fixtures import timeline_html
+from scraper_engine import ScraperEngine
+
+
+async def extract_per_element(page):
+    # The extraction path the GUI used before: one inner_text() round trip per tweet
+    await page.wait_for_selector('article div[lang]')
+    tweets = await page.query_selector_all('article div[lang]')
+    return [await tweet.inner_text() for tweet in tweets]
+
+
+async def time_ticks(extract, page, ticks):
+    timings = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        await extract(page)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def run(sizes, ticks, page_file):
+    engine = ScraperEngine(0, 0)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        print(f"{'tweets':>7} {'per-element ms':>15} {'batched ms':>11} {'speedup':>8}")
+        for size in sizes:
+            if page_file:
+                with open(page_file, encoding='utf-8') as saved_page:
+                    await page.set_content(saved_page.read())
+            else:
+                await page.set_content(timeline_html(visible=size))
+            old = await time_ticks(extract_per_element, page, ticks)
+            new = await time_ticks(engine.extract_tweet_records, page, ticks)
+            count = len(await engine.extract_tweet_records(page))
+            old_ms, new_ms = statistics.median(old), statistics.median(new)
+            print(f"{count:>7} {old_ms:>15.2f} {new_ms:>11.2f} {old_ms / new_ms:>7.1f}x")
+            if page_file:
+                break
+        await browser.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-tick extraction latency: per-element inner_text vs one page.evaluate")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 100, 200])
+    parser.add_argument('--ticks', type=int, default=30)
+    parser.add_argument('--page', help="Saved timeline HTML to use instead of the generated fixture")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.sizes, args.ticks, args.page))
+
+
+if __name__ == "__main__":
+    main()
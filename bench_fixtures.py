@@ -0,0 +1,202 @@
+import contextlib
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "tesla rocket launch free speech twitter mars starship ai model battery factory "
+    "engine orbit booster update video fun people earth government law comedy bitcoin"
+).split()
+
+# Renders tweets the way the live timeline does: an <article> per tweet with the text in div[lang],
+# and only the newest VISIBLE articles kept in the DOM so the first tweet changes as you scroll
+TIMELINE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>timeline</title></head>
+<body><main id="timeline">%(articles)s</main>
+<script>
+var nextId = %(next_id)d;
+var words = %(words)s;
+var VISIBLE = %(visible)d;
+var BATCH = %(batch)d;
+function makeArticle(id) {
+    var n = 8 + (id * 7) %% 20, text = [];
+    for (var i = 0; i < n; i++) { text.push(words[(id * 31 + i * 17) %% words.length]); }
+    var article = document.createElement('article');
+    article.setAttribute('data-testid', 'tweet');
+    article.innerHTML = '<div data-testid="User-Name"><a href="/user' + (id %% 13) + '">@user' + (id %% 13) + '</a></div>'
+        + '<a href="/user' + (id %% 13) + '/status/' + id + '"><time datetime="2024-05-0' + (1 + id %% 9) + 'T12:00:00.000Z"></time></a>'
+        + '<div lang="en" data-testid="tweetText">' + id + ' ' + text.join(' ') + '</div>'
+        + '<div role="group" aria-label="' + (id %% 50) + ' replies, ' + (id %% 70) + ' reposts, ' + (id %% 90) + ' likes"></div>'
+        + '<img src="/media/' + id + '.jpg">';
+    return article;
+}
+window.addEventListener('scroll', function () {
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 50) { return; }
+    var timeline = document.getElementById('timeline');
+    for (var i = 0; i < BATCH; i++) { timeline.appendChild(makeArticle(nextId++)); }
+    while (timeline.children.length > VISIBLE) { timeline.removeChild(timeline.firstChild); }
+});
+</script></body></html>"""
+
+
+def tweet_text(tweet_id, rng):
+    return "%d %s" % (tweet_id, " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 28))))
+
+
+def article_html(tweet_id, text):
+    user = "user%d" % (tweet_id % 13)
+    return (
+        '<article data-testid="tweet">'
+        '<div data-testid="User-Name"><a href="/%s">@%s</a></div>'
+        '<a href="/%s/status/%d"><time datetime="2024-05-01T12:00:00.000Z"></time></a>'
+        '<div lang="en" data-testid="tweetText">%s</div>'
+        '<div role="group" aria-label="%d replies, %d reposts, %d likes"></div>'
+        '<img src="/media/%d.jpg">'
+        '</article>'
+    ) % (user, user, user, tweet_id, text, tweet_id % 50, tweet_id % 70, tweet_id % 90, tweet_id)
+
+
+def timeline_html(seed=0, visible=40, batch=20):
+    rng = random.Random(seed)
+    first_id = seed * 1000000
+    articles = "".join(article_html(first_id + i, tweet_text(first_id + i, rng)) for i in range(visible))
+    return TIMELINE_TEMPLATE % {
+        'articles': articles,
+        'next_id': first_id + visible,
+        'words': repr(WORDS).replace("'", '"'),
+        'visible': visible,
+        'batch': batch,
+    }
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # /timeline/<seed> serves a scrollable timeline, everything else is a small binary asset
+    def do_GET(self):
+        if self.path.startswith('/timeline'):
+            seed = self.path[len('/timeline'):].strip('/')
+            body = timeline_html(int(seed) if seed.isdigit() else 0).encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+        else:
+            body = b'\0' * 20000
+            content_type = 'image/jpeg'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    # Minimal OpenAI-compatible chat completions and embeddings endpoints with configurable model latency, chat
+    # streamed as server-sent events when the request asks for stream=True. rate_limit_ratio of the requests are
+    # rejected with a 429 and a Retry-After header, like an account over its rate limit.
+    first_token_delay = 0.5
+    token_delay = 0.02
+    embedding_delay = 0.05
+    embedding_dim = 64
+    rate_limit_ratio = 0.0
+    retry_after = 0.1
+    counts = {'requests': 0, 'rate_limited': 0, 'inputs': 0}
+    counts_lock = threading.Lock()
+    answer = ("Based on the tweets he keeps talking about rockets, electric cars and free speech, "
+              "and he is excited about the next Starship launch.")
+    protocol_version = 'HTTP/1.1'
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = self.read_json()
+        with self.counts_lock:
+            self.counts['requests'] += 1
+            limited = random.random() < self.rate_limit_ratio
+            if limited:
+                self.counts['rate_limited'] += 1
+        if limited:
+            body = json.dumps({'error': {'message': 'Rate limit reached', 'type': 'requests'}}).encode('utf-8')
+            self.send_response(429)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Retry-After', str(self.retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.endswith('/chat/completions'):
+            self.chat_completion(request)
+        elif self.path.endswith('/embeddings'):
+            self.embeddings(request)
+        else:
+            self.send_json({'error': {'message': f"Unknown path {self.path}"}}, status=404)
+
+    def chat_completion(self, request):
+        model = request.get('model', 'mock')
+        tokens = [word + ' ' for word in self.answer.split(' ')]
+        time.sleep(self.first_token_delay)
+        if not request.get('stream'):
+            time.sleep(self.token_delay * len(tokens))
+            self.send_json({
+                'id': 'mock', 'object': 'chat.completion', 'created': 0, 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ''.join(tokens)}}],
+            })
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.token_delay)
+            chunk = {
+                'id': 'mock', 'object': 'chat.completion.chunk', 'created': 0, 'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+            }
+            self.wfile.write(b'data: ' + json.dumps(chunk).encode('utf-8') + b'\n\n')
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+        self.close_connection = True
+
+    def embeddings(self, request):
+        texts = request.get('input', [])
+        texts = [texts] if isinstance(texts, str) else texts
+        with self.counts_lock:
+            self.counts['inputs'] += len(texts)
+        time.sleep(self.embedding_delay)
+        data = []
+        for i, text in enumerate(texts):
+            digest = hashlib.sha256(text.encode('utf-8')).digest() * (self.embedding_dim // 32 + 1)
+            data.append({'object': 'embedding', 'index': i,
+                         'embedding': [byte / 255.0 - 0.5 for byte in digest[:self.embedding_dim]]})
+        self.send_json({
+            'object': 'list', 'data': data, 'model': request.get('model', 'mock'),
+            'usage': {'prompt_tokens': 0, 'total_tokens': 0},
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def fixture_server(handler=FixtureHandler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:%d' % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from bench_fixtures import tweet_text
+from chat_index import TweetIndex
+from embeddings import HashingEmbeddings
+from live_index import LiveIndexer
+from tweet_store import TweetStore
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def scrape(indexer, store, batches, batch_size, interval):
+    # Stands in for ScraperEngine.save: store first, then the live index, waiting whenever its queue is full
+    rng = random.Random(1)
+    for batch in range(batches):
+        records = [
+            {'id': f"live{batch}-{i}", 'author': f"user{i % 7}", 'text': tweet_text(batch * batch_size + i, rng)}
+            for i in range(batch_size)
+        ]
+        await store.write(records)
+        await indexer.put(records)
+        await asyncio.sleep(interval)
+    await store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture-to-searchable lag and chat query latency while indexing live")
+    parser.add_argument('--initial', type=int, default=20000)
+    parser.add_argument('--batches', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        store = TweetStore(f"{directory}/store")
+        store.append_records([{'id': str(i), 'text': tweet_text(i, rng)} for i in range(args.initial)])
+        tweet_index = TweetIndex(HashingEmbeddings(), f"{directory}/index", store)
+        tweet_index.open()
+        tweet_index.search("warm up", 1)
+
+        lags = []
+        indexer = LiveIndexer(tweet_index, on_indexed=lambda added, lag: lags.append(lag))
+        indexer.start()
+
+        queries, done = [], threading.Event()
+
+        def chat():
+            while not done.is_set():
+                start = time.perf_counter()
+                tweet_index.search("what is he saying about tesla", 5)
+                queries.append(time.perf_counter() - start)
+                time.sleep(0.05)
+
+        chatting = threading.Thread(target=chat)
+        chatting.start()
+        start = time.perf_counter()
+        asyncio.run(scrape(indexer, store, args.batches, args.batch_size, args.interval))
+        indexer.stop()
+        elapsed = time.perf_counter() - start
+        done.set()
+        chatting.join()
+
+        live = args.batches * args.batch_size
+        print(f"{live} tweets scraped live over {elapsed:.1f}s on top of {args.initial} indexed")
+        print(f"indexed live:            {indexer.indexed}")
+        print(f"capture to searchable:   p50 {statistics.median(lags):.2f}s, p99 {percentile(lags, 0.99):.2f}s")
+        print(f"chat query while live:   p50 {statistics.median(queries) * 1000:.1f}ms, "
+              f"p99 {percentile(queries, 0.99) * 1000:.1f}ms")
+
+        # Without live indexing the same tweets wait for the next chat open, which embeds them in one pause
+        reopened = TweetIndex(HashingEmbeddings(), f"{directory}/rebuilt", store)
+        start = time.perf_counter()
+        reopened.open()
+        print(f"full rebuild instead:    {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        added = TweetIndex(HashingEmbeddings(), f"{directory}/index", store).open()
+        print(f"reopen live index:       {time.perf_counter() - start:.2f}s, {added} tweets embedded again")
+
+
+if __name__ == "__main__":
+    main()
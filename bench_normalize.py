@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import random
+import time
+
+from bench_fixtures import WORDS
+from text_pipeline import TextNormalizer, normalize_batch
+
+DECORATIONS = (
+    lambda rng: f"https://t.co/{rng.randrange(16 ** 8):08x}",
+    lambda rng: f"@user{rng.randrange(1000)}",
+    lambda rng: f"#{rng.choice(WORDS)}",
+    lambda rng: "<span class=\"r-18u37iz\">" + rng.choice(WORDS) + "</span>",
+    lambda rng: "&amp;",
+    lambda rng: "\n\n",
+    lambda rng: "\uff34\uff45\uff53\uff4c\uff41",  # fullwidth, folded by NFKC
+)
+
+
+def synthetic_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(12, 40))]
+        for _ in range(rng.randint(1, 5)):
+            words.insert(rng.randrange(len(words)), rng.choice(DECORATIONS)(rng))
+        records.append({'id': str(i), 'text': ' '.join(words)})
+    return records
+
+
+async def measure(normalizer, records, batch_size):
+    # Normalises the corpus in scraper-sized batches while a ticker task measures how long the event loop stalls
+    stalls = []
+    running = True
+
+    async def ticker():
+        loop = asyncio.get_running_loop()
+        while running:
+            before = loop.time()
+            await asyncio.sleep(0.005)
+            stalls.append(loop.time() - before - 0.005)
+
+    ticking = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    if normalizer is None:
+        for batch in batches:
+            normalize_batch(batch)  # inline on the event loop, the way per-post cleaning ran before
+            await asyncio.sleep(0)
+    else:
+        await asyncio.gather(*(normalizer.normalize(batch) for batch in batches))
+        normalizer.close()
+    elapsed = time.perf_counter() - start
+    running = False
+    await ticking
+    return elapsed, max(stalls, default=0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalisation throughput and event loop stalls by worker count")
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    args = parser.parse_args(argv)
+
+    records = synthetic_records(args.records)
+    print(f"{len(records)} synthetic tweets, batches of {args.batch_size}")
+    print(f"{'stage':>16} {'seconds':>8} {'records/sec':>12} {'max stall ms':>13}")
+    runs = [('inline', None)] + [
+        (f"{workers} processes" if workers else 'thread', TextNormalizer(workers, args.chunk_size))
+        for workers in args.workers
+    ]
+    for name, normalizer in runs:
+        elapsed, stall = asyncio.run(measure(normalizer, records, args.batch_size))
+        print(f"{name:>16} {elapsed:>8.2f} {len(records) / elapsed:>12.0f} {stall * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
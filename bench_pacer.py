@@ -0,0 +1,67 @@
+import argparse
+
+from pacer import AdaptivePacer, FixedPacer
+
+
+class SyntheticFeed:
+    # A finite timeline that loads `batch` tweets per scroll, answers slowly and with nothing new when scrolled
+    # more often than every `min_gap` seconds (rate limiting), and runs dry after `total` tweets
+    def __init__(self, total=3000, batch=25, load_time=0.3, min_gap=0.8, throttled_load=4.0):
+        self.remaining = total
+        self.batch = batch
+        self.load_time = load_time
+        self.min_gap = min_gap
+        self.throttled_load = throttled_load
+        self.last_scroll = None
+
+    def scroll(self, now):
+        throttled = self.last_scroll is not None and now - self.last_scroll < self.min_gap
+        self.last_scroll = now
+        if throttled:
+            return 0, self.throttled_load
+        new_items = min(self.batch, self.remaining)
+        self.remaining -= new_items
+        return new_items, self.load_time
+
+
+def simulate(pacer, feed, run_time):
+    # Virtual clock, so a one hour scrape is simulated in milliseconds
+    now = 0.0
+    items = 0
+    scrolls = 0
+    last_item_at = 0.0
+    while now < run_time:
+        now += pacer.interval
+        pacer.scrolled(now)
+        if pacer.exhausted:
+            break
+        new_items, latency = feed.scroll(now)
+        now += latency
+        pacer.observe(new_items, now)
+        items += new_items
+        scrolls += 1
+        if new_items:
+            last_item_at = now
+    return items, min(now, run_time), scrolls, last_item_at
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Unique tweets per second of fixed vs adaptive scroll pacing on a synthetic feed")
+    parser.add_argument('--run-time', type=float, default=3600.0)
+    parser.add_argument('--total', type=int, default=3000)
+    args = parser.parse_args(argv)
+
+    pacers = [
+        ("fixed 5s", lambda: FixedPacer(5.0)),
+        ("fixed 1s", lambda: FixedPacer(1.0)),
+        ("fixed 0.5s", lambda: FixedPacer(0.5)),
+        ("adaptive from 5s", lambda: AdaptivePacer(5.0)),
+    ]
+    print(f"{'pacer':>18} {'tweets':>7} {'last new at':>12} {'stopped at':>11} {'scrolls':>8} {'tweets/sec':>11}")
+    for name, make_pacer in pacers:
+        items, elapsed, scrolls, last_item_at = simulate(make_pacer(), SyntheticFeed(total=args.total), args.run_time)
+        print(f"{name:>18} {items:>7} {last_item_at:>12.1f} {elapsed:>11.1f} {scrolls:>8} {items / elapsed:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
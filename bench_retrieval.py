@@ -0,0 +1,63 @@
+import argparse
+import random
+import tempfile
+import time
+
+from bench_fixtures import WORDS, tweet_text
+from chat_index import TweetIndex
+from embeddings import HashingEmbeddings
+from retrieval import parse_query
+from tweet_store import TweetStore
+
+AUTHORS = 50
+
+
+def synthetic_records(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': str(i),
+            'author': f"user{i % AUTHORS}",
+            'timestamp': f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00.000Z",
+            'text': tweet_text(i, rng),
+        }
+        for i in range(count)
+    ]
+
+
+def relevant(document, word, author):
+    return document.metadata.get('author') == author and word in document.page_content.split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precision of vector-only vs hybrid retrieval on author/topic questions")
+    parser.add_argument('--tweets', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        store = TweetStore(f"{directory}/store")
+        store.append_records(synthetic_records(args.tweets))
+        tweet_index = TweetIndex(HashingEmbeddings(), f"{directory}/index", store)
+        tweet_index.open()
+        tweet_index.search("warm up", 1)
+
+        questions = [(rng.choice(WORDS), f"user{rng.randrange(AUTHORS)}") for _ in range(args.queries)]
+        print(f"{'retrieval':>10} {'precision':>10} {'ms/query':>9}")
+        for name in ('vector', 'hybrid'):
+            hits, start = 0, time.perf_counter()
+            for word, author in questions:
+                if name == 'vector':
+                    documents = tweet_index.similarity_search(f"what does @{author} say about {word}", k=args.k)
+                else:
+                    query, filters = parse_query(f"what does he say about {word} from:{author}")
+                    documents = tweet_index.search(query, k=args.k, **filters)
+                hits += sum(relevant(document, word, author) for document in documents)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10} {hits / (args.queries * args.k):>10.2f} {elapsed * 1000 / args.queries:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import time
+
+from bench_fixtures import fixture_server
+from scraper_engine import ScraperEngine
+from seen_store import SeenTweets
+
+
+class NullSink:
+    async def write(self, records):
+        pass
+
+    async def close(self):
+        pass
+
+
+def run_once(base_url, targets, pages, run_time, scroll_interval, mode):
+    urls = [f"{base_url}/timeline/{i}" for i in range(targets)]
+    engine = ScraperEngine(
+        run_time,
+        scroll_interval,
+        urls=urls,
+        sink=NullSink(),
+        profile_dir=None,
+        concurrency=pages,
+        seen=SeenTweets(path=None),
+        mode=mode,
+    )
+    start = time.perf_counter()
+    results = asyncio.run(engine.run())
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if result.error is not None]
+    return engine.saved_count, elapsed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tweets/sec scaling with the number of pages in the pool")
+    parser.add_argument('--targets', type=int, default=8)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--run-time', type=float, default=3.0, help="Run time per target (seconds)")
+    parser.add_argument('--scroll-interval', type=float, default=0.25)
+    parser.add_argument('--mode', choices=['poll', 'stream'], default='poll')
+    args = parser.parse_args(argv)
+
+    with fixture_server() as base_url:
+        print(f"{'pages':>6} {'tweets':>8} {'seconds':>8} {'tweets/sec':>11}")
+        for pages in args.pages:
+            saved, elapsed, failed = run_once(base_url, args.targets, pages, args.run_time, args.scroll_interval, args.mode)
+            print(f"{pages:>6} {saved:>8} {elapsed:>8.1f} {saved / elapsed:>11.1f}")
+            for result in failed:
+                print(f"    {result}")
+
+
+if __name__ == "__main__":
+    main()
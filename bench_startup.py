@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from warmup import CHAT_MODULES, SCRAPER_MODULES
+
+HEAVY_PACKAGES = (
+    'playwright', 'langchain', 'langchain_core', 'langchain_community', 'faiss', 'openai', 'httpx', 'numpy',
+    'tiktoken', 'torch', 'sentence_transformers',
+)
+MARK = '--measure--'
+
+# name, modules loaded before the measurement, modules measured, guarded (part of sign-in -> window)
+STAGES = (
+    ('sign-in window', (), ('app',), True),
+    ('free window', ('app',), ('MAIN_UI',), True),
+    ('chat window', ('app',), ('MAIN_UI_CHAT',), True),
+    ('scraper start', ('app', 'MAIN_UI_CHAT'), SCRAPER_MODULES, False),
+    ('chat open', ('app', 'MAIN_UI_CHAT'), CHAT_MODULES, False),
+)
+
+
+def import_times(before, modules):
+    # Runs a fresh interpreter with -X importtime and returns {module: cumulative microseconds} for everything
+    # imported by `modules` once `before` is already loaded, the way it happens inside the running app
+    code = '; '.join(
+        [f"import {name}" for name in before]
+        + [f"import sys; sys.stderr.write({MARK!r} + chr(10))"]
+        + [f"import {name}" for name in modules]
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = result.stderr.splitlines()
+    times = {}
+    for line in lines[lines.index(MARK) + 1:]:
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = (int(cumulative), not name.startswith('  '))
+    return times
+
+
+def measure(before, modules, repeats):
+    totals = []
+    loaded = set()
+    for _ in range(repeats):
+        times = import_times(before, modules)
+        totals.append(sum(cumulative for cumulative, top_level in times.values() if top_level) / 1000)
+        loaded.update(times)
+    heavy = sorted({name.split('.')[0] for name in loaded} & set(HEAVY_PACKAGES))
+    return statistics.median(totals), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time of each startup stage, guarding sign-in -> window")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=200.0, help="limit for each guarded stage")
+    args = parser.parse_args(argv)
+
+    import_times((), ('app', 'MAIN_UI', 'MAIN_UI_CHAT') + SCRAPER_MODULES + CHAT_MODULES)  # writes the .pyc files
+    failures = []
+    print(f"{'stage':>16} {'import ms':>10}  heavy packages")
+    for name, before, modules, guarded in STAGES:
+        elapsed, heavy = measure(before, modules, args.repeats)
+        print(f"{name:>16} {elapsed:>10.1f}  {', '.join(heavy) or '-'}")
+        if guarded and heavy:
+            failures.append(f"{name} imports {', '.join(heavy)}")
+        if guarded and elapsed > args.budget_ms:
+            failures.append(f"{name} takes {elapsed:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
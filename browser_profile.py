@@ -0,0 +1,64 @@
+from urllib.parse import urlsplit
+
+PROFILE_DIR = 'browser_profile'
+
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font'}
+
+BLOCKED_HOSTS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'ads-twitter.com',
+    'ads-api.twitter.com',
+    'analytics.twitter.com',
+    'static.ads-twitter.com',
+    'scorecardresearch.com',
+    'facebook.net',
+    'bat.bing.com',
+    'px.ads.linkedin.com',
+    'snap.licdn.com',
+)
+
+LIGHTWEIGHT_ARGS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--mute-audio',
+    '--no-first-run',
+]
+
+
+def is_blocked(resource_type, url):
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlsplit(url).hostname or ''
+    return any(host == blocked or host.endswith('.' + blocked) for blocked in BLOCKED_HOSTS)
+
+
+async def block_heavy_resources(route):
+    if is_blocked(route.request.resource_type, route.request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def open_scraping_context(playwright, headless=True, user_data_dir=PROFILE_DIR, block_resources=True):
+    # With a user_data_dir the context is persistent, so cookies (the logged-in session) and the HTTP cache
+    # survive between runs. Only one process can use a given profile directory at a time.
+    if user_data_dir:
+        context = await playwright.chromium.launch_persistent_context(user_data_dir, headless=headless, args=LIGHTWEIGHT_ARGS)
+    else:
+        browser = await playwright.chromium.launch(headless=headless, args=LIGHTWEIGHT_ARGS)
+        context = await browser.new_context()
+    if block_resources:
+        await context.route('**/*', block_heavy_resources)
+    return context
+
+
+async def close_scraping_context(context):
+    browser = context.browser
+    await context.close()
+    if browser is not None:
+        await browser.close()
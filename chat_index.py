@@ -0,0 +1,479 @@
+import glob
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from ann_index import (
+    INDEX_TYPE, build_index, factory_string, reconstruct, search_parameters, training_size, tune,
+)
+from dedup import Deduplicator
+from documents import build_documents
+from embeddings import embedding_model_name
+from retrieval import reciprocal_rank_fusion, tokenize
+from tweet_store import TweetStore
+
+INDEX_DIR = 'tweet_index'
+MANIFEST = 'manifest.json'
+DOCSTORE = 'documents.sqlite'
+ADD_BATCH = 10000
+FETCH_BATCH = 500
+MERGE_SIZE = 20000
+EXACT_FILTER = 4096  # filters passing up to this many tweets are searched exactly
+
+# IO_FLAG_MMAP_IFC maps flat vectors straight from the file, older faiss builds only know IO_FLAG_MMAP.
+# A mapped flat index is read-only: adding to it aborts the process, new vectors go to the delta index instead.
+MMAP_FLAG = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+
+
+def record_key(record):
+    # Tweet id, or a hash of the text for records without one (imported from tweets.txt)
+    if record.get('id'):
+        return record['id']
+    return 'text:' + hashlib.sha1(record.get('text', '').encode('utf-8')).hexdigest()
+
+
+def keyword_terms(text, author):
+    # What the keyword table indexes: tokenize() of the text with the author's handle, hashtags and handles in both
+    # their exact and bare forms
+    return ' '.join(tokenize(f"@{author} {text}" if author else text))
+
+
+class TweetIndex:
+    # FAISS index of the tweet store saved under `directory` together with a manifest of how far into each store
+    # segment it reaches, so opening it only embeds the tweets written since the last build. index_type picks an
+    # exact flat index or a compressed/graph ANN index (hnsw, ivf, ivfpq), nprobe and ef_search tune their recall.
+    # Documents live in a SQLite table keyed by vector position and are read per search. The vectors are split into
+    # a memory-mapped base file that is never written to and a small owned flat `delta` index of the vectors added
+    # since, and searches look in both. merge() folds the delta into a new base file outside the lock: on open only
+    # once the delta outgrows the base (the embedding that grew it already cost more), otherwise from the LiveIndexer
+    # past merge_size vectors, so opening costs the same for any corpus size. The manifest names the files it belongs
+    # to and is replaced last, documents added after them are dropped again on open. Every record that was indexed,
+    # collapsed into an indexed one or skipped has its key in the docstore too, which lets a save advance the store
+    # offsets past tweets a LiveIndexer added, so they are not read again on the next open.
+    # Searches and additions from different threads (the chat and a LiveIndexer) are serialised by `lock`, tweets
+    # are embedded outside it.
+    def __init__(self, embeddings, directory=INDEX_DIR, store=None, pack_tokens=None, index_type=INDEX_TYPE,
+                 nlist=1024, hnsw_m=32, pq_m=None, nprobe=16, ef_search=64, dedupe=True, merge_size=MERGE_SIZE):
+        self.embeddings = embeddings
+        self.pack_tokens = pack_tokens
+        self.index_type = index_type
+        self.nlist = nlist
+        self.hnsw_m = hnsw_m
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.merge_size = merge_size
+        self.directory = directory
+        self.store = store if store is not None else TweetStore()
+        self.index = None
+        self.delta = None
+        self.docstore = None
+        self.changed = False
+        self.deduplicator = Deduplicator() if dedupe else None
+        self.dedup_stats = {'records': 0, 'kept': 0, 'reduction': 0.0}
+        self.lock = threading.RLock()
+        self.manifest = self.empty_manifest()
+
+    def empty_manifest(self):
+        return {
+            'model': embedding_model_name(self.embeddings), 'chunking': self.chunking(), 'index': self.index_config(),
+            'file': None, 'delta': None, 'offsets': {}, 'documents': 0,
+        }
+
+    def chunking(self):
+        return f"records:{self.pack_tokens or 0}"
+
+    def index_config(self):
+        if self.index_type == 'flat':
+            return 'flat'
+        if self.index_type == 'hnsw':
+            return f"hnsw:{self.hnsw_m}"
+        return f"{self.index_type}:{self.nlist}:{self.pq_m or 'auto'}"
+
+    @property
+    def ntotal(self):
+        return self.manifest['documents']
+
+    @property
+    def base_size(self):
+        return self.index.ntotal if self.index is not None else 0
+
+    @property
+    def version(self):
+        # Changes whenever the index gains documents or is rebuilt, answers cached for an older version are stale
+        return f"{self.manifest['model']}:{self.manifest['chunking']}:{self.manifest['documents']}"
+
+    def read_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        if (
+            'file' not in manifest  # saved by LangChain's FAISS.save_local, with a pickled docstore
+            or manifest.get('model') != embedding_model_name(self.embeddings)
+            or manifest.get('chunking') != self.chunking()
+            or manifest.get('index', 'flat') != self.index_config()
+        ):
+            # Vectors from another embedding model, chunking or index structure can't be mixed with new ones
+            return None
+        manifest.setdefault('delta', None)  # saved before the delta index
+        return manifest
+
+    def connect(self):
+        # Rows past the saved index belong to vectors that were never saved, they are added again from the store
+        os.makedirs(self.directory, exist_ok=True)
+        self.docstore = sqlite3.connect(os.path.join(self.directory, DOCSTORE), check_same_thread=False)
+        self.docstore.execute("PRAGMA journal_mode=WAL")
+        self.docstore.execute("PRAGMA synchronous=NORMAL")
+        self.docstore.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "position INTEGER PRIMARY KEY, text TEXT, metadata TEXT, author TEXT, timestamp TEXT)"
+        )
+        self.docstore.execute("CREATE INDEX IF NOT EXISTS documents_author ON documents (author, timestamp)")
+        self.docstore.execute("CREATE INDEX IF NOT EXISTS documents_timestamp ON documents (timestamp)")
+        self.docstore.execute("CREATE TABLE IF NOT EXISTS records (key TEXT PRIMARY KEY, position INTEGER)")
+        # BM25 over keyword_terms(), rowid is the vector position; '#' and '@' are part of a token
+        self.docstore.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS keywords USING fts5(terms, tokenize=\"unicode61 tokenchars '#@'\")"
+        )
+        self.docstore.execute("DELETE FROM documents WHERE position >= ?", (self.manifest['documents'],))
+        self.docstore.execute("DELETE FROM records WHERE position >= ?", (self.manifest['documents'],))
+        self.docstore.execute("DELETE FROM keywords WHERE rowid >= ?", (self.manifest['documents'],))
+        # Docstores written before the keyword table get it filled once
+        (indexed,) = self.docstore.execute("SELECT COALESCE(MAX(rowid) + 1, 0) FROM keywords").fetchone()
+        rows = self.docstore.execute(
+            "SELECT position, text, author FROM documents WHERE position >= ? ORDER BY position", (indexed,)
+        )
+        while True:
+            batch = rows.fetchmany(ADD_BATCH)
+            if not batch:
+                break
+            self.docstore.executemany(
+                "INSERT INTO keywords (rowid, terms) VALUES (?, ?)",
+                [(position, keyword_terms(text, author)) for position, text, author in batch],
+            )
+        self.docstore.commit()
+        for path in glob.glob(os.path.join(self.directory, 'merge-*')):
+            os.remove(path)  # left by a merge that never finished
+
+    def load(self):
+        self.index = self.delta = None
+        if self.manifest['file']:
+            self.index = faiss.read_index(os.path.join(self.directory, self.manifest['file']), MMAP_FLAG)
+            tune(self.index, self.nprobe, self.ef_search)
+        if self.manifest.get('delta'):
+            self.delta = faiss.read_index(os.path.join(self.directory, self.manifest['delta']))
+
+    def write_index(self, index, prefix):
+        # Under a fresh name, files named by a saved manifest are never overwritten
+        handle, path = tempfile.mkstemp(prefix=prefix, suffix='.faiss', dir=self.directory)
+        os.close(handle)
+        faiss.write_index(index, path)
+        return os.path.basename(path)
+
+    def save(self):
+        # Only the delta is written, the manifest is replaced last, so an index opened at any moment (or after a
+        # crash) finds a manifest and the files it names
+        with self.lock:
+            self.docstore.commit()
+            self.manifest['offsets'] = self.covered_offsets()
+            if self.changed:
+                has_delta = self.delta is not None and self.delta.ntotal
+                self.manifest['delta'] = self.write_index(self.delta, 'delta-') if has_delta else None
+                self.changed = False
+            temporary = os.path.join(self.directory, MANIFEST + '.tmp')
+            with open(temporary, 'w', encoding='utf-8') as manifest_file:
+                json.dump(self.manifest, manifest_file)
+            os.replace(temporary, os.path.join(self.directory, MANIFEST))
+            current = {self.manifest['file'], self.manifest['delta']}
+            for path in glob.glob(os.path.join(self.directory, 'index*')) + glob.glob(
+                os.path.join(self.directory, 'delta*')
+            ):
+                if os.path.basename(path) not in current:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass  # still mapped by an open index on Windows, removed by a later save
+
+    def needs_merge(self):
+        return self.delta is not None and self.delta.ntotal >= min(self.merge_size, self.base_size)
+
+    def merge(self):
+        # Writes base + delta as the new base file. The copy, the adds, the ANN build and the write happen outside
+        # the lock, searches and live additions go on meanwhile; vectors added during the merge stay in the delta.
+        with self.lock:
+            if self.delta is None or not self.delta.ntotal:
+                return
+            count = self.delta.ntotal
+            vectors = self.delta.reconstruct_n(0, count)
+            base = self.manifest['file']
+        if base:
+            merged = faiss.read_index(os.path.join(self.directory, base))
+        else:
+            merged = faiss.IndexFlatL2(vectors.shape[1])
+        merged.add(vectors)
+        staged = self.write_index(self.compress(merged), 'merge-')
+        name = 'index-' + staged[len('merge-'):]
+        with self.lock:
+            # Renamed under the lock, a save meanwhile would sweep an index file that no manifest names yet
+            os.replace(os.path.join(self.directory, staged), os.path.join(self.directory, name))
+            self.manifest['file'] = name
+            self.index = faiss.read_index(os.path.join(self.directory, self.manifest['file']), MMAP_FLAG)
+            tune(self.index, self.nprobe, self.ef_search)
+            delta = faiss.IndexFlatL2(self.delta.d)
+            if self.delta.ntotal > count:
+                delta.add(self.delta.reconstruct_n(count, self.delta.ntotal - count))
+            self.delta = delta
+            self.changed = True
+            self.save()
+
+    def open(self):
+        # Returns the number of documents added to the index
+        self.manifest = self.read_manifest() or self.empty_manifest()
+        self.connect()
+        self.load()
+        records, offsets = self.store.read_since(self.manifest['offsets'])
+        if not records:
+            return 0
+
+        added = self.index_records(records)
+        self.manifest['offsets'] = offsets
+        if self.delta is not None and self.delta.ntotal >= self.base_size:
+            self.merge()
+        elif self.ntotal:
+            self.save()
+        return added
+
+    def fetch(self, positions):
+        # Documents for FAISS positions, in the order given
+        rows = {}
+        for start in range(0, len(positions), FETCH_BATCH):
+            batch = positions[start:start + FETCH_BATCH]
+            rows.update(
+                (position, (text, metadata)) for position, text, metadata in self.docstore.execute(
+                    f"SELECT position, text, metadata FROM documents WHERE position IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        return [
+            Document(page_content=rows[position][0], metadata=json.loads(rows[position][1]))
+            for position in positions if position in rows
+        ]
+
+    def indexed_keys(self, keys):
+        indexed = set()
+        keys = list(keys)
+        for start in range(0, len(keys), FETCH_BATCH):
+            batch = keys[start:start + FETCH_BATCH]
+            indexed.update(key for (key,) in self.docstore.execute(
+                f"SELECT key FROM records WHERE key IN ({','.join('?' * len(batch))})", batch,
+            ))
+        return indexed
+
+    def covered_offsets(self):
+        # Store offsets up to which every record has its key in the docstore. The scan stops at the first record
+        # that isn't indexed yet (still queued for the LiveIndexer, or scraped while the chat was closed).
+        offsets = dict(self.manifest['offsets'])
+        scanned = self.store.scan_since(offsets)
+        while True:
+            chunk = list(itertools.islice(scanned, FETCH_BATCH))
+            if not chunk:
+                return offsets
+            indexed = self.indexed_keys(record_key(record) for _, _, record in chunk)
+            for segment, end, record in chunk:
+                if record_key(record) not in indexed:
+                    return offsets
+                offsets[segment] = end
+
+    def collapse(self, records, indexed=frozenset()):
+        # Retweets, repeated snapshots and near-identical copies within the records being added are dropped before
+        # they are embedded. A cluster that already has an indexed tweet (re-read after live indexing) keeps that one.
+        if self.deduplicator is None or not records:
+            return records
+        records, self.dedup_stats = self.deduplicator.collapse(
+            records, prefer=lambda record: record_key(record) in indexed,
+        )
+        return records
+
+    def index_records(self, records):
+        # Embeds the records that aren't indexed yet, after collapsing duplicates, and records every key as covered.
+        # Returns the number of documents added.
+        with self.lock:
+            keys = [record_key(record) for record in records]
+            indexed = self.indexed_keys(keys)
+            kept = self.collapse(records, indexed)
+        documents = build_documents([record for record in kept if record_key(record) not in indexed], self.pack_tokens)
+        if documents:
+            self.add_documents(documents)
+        with self.lock:
+            # Tied to the last document, so they are dropped together if that never reaches a saved index
+            position = max(self.manifest['documents'] - 1, 0)
+            self.docstore.executemany(
+                "INSERT OR IGNORE INTO records VALUES (?, ?)", [(key, position) for key in set(keys) - indexed],
+            )
+        return len(documents)
+
+    def add_records(self, records):
+        # Live additions from the scraper, returns the number of documents added
+        return self.index_records(records)
+
+    def add_documents(self, documents):
+        # Embedded and added in batches, so a multi-million tweet build never holds every vector as Python floats
+        for start in range(0, len(documents), ADD_BATCH):
+            batch = documents[start:start + ADD_BATCH]
+            texts = [document.page_content for document in batch]
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            with self.lock:
+                if self.delta is None:
+                    self.delta = faiss.IndexFlatL2(vectors.shape[1])
+                first = self.manifest['documents']
+                rows = [
+                    (
+                        first + i, document.page_content, json.dumps(document.metadata),
+                        (document.metadata.get('author') or '').lower(), document.metadata.get('timestamp') or '',
+                    )
+                    for i, document in enumerate(batch)
+                ]
+                self.docstore.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)", rows)
+                self.docstore.executemany(
+                    "INSERT OR REPLACE INTO keywords (rowid, terms) VALUES (?, ?)",
+                    [(position, keyword_terms(text, author)) for position, text, _, author, _ in rows],
+                )
+                self.delta.add(vectors)
+                self.changed = True
+                self.manifest['documents'] += len(batch)
+
+    def compress(self, index):
+        # A merged exact flat base is swapped for the configured ANN index once there are enough vectors to train it
+        # on, later merges add to the trained index directly
+        if self.index_type == 'flat' or not isinstance(index, faiss.IndexFlat):
+            return index
+        train_size = training_size(self.index_type, self.nlist)
+        if index.ntotal < train_size:
+            return index
+        description = factory_string(self.index_type, index.d, self.nlist, self.hnsw_m, self.pq_m)
+        return build_index(description, index.reconstruct_n(0, index.ntotal), train_size)
+
+    def similarity_search(self, query, k=4):
+        if not self.ntotal:
+            return []
+        vector = self.embeddings.embed_query(query)
+        with self.lock:
+            return self.fetch(self.vector_search(vector, k))
+
+    def filter_clause(self, author=None, since=None, until=None):
+        # SQL over the documents table, served by its author and timestamp indexes
+        clauses, parameters = [], []
+        if author:
+            clauses.append("author = ?")
+            parameters.append(author.lstrip('@').lower())
+        # ISO timestamps compare correctly as strings, tweets without one never pass a date filter
+        if since:
+            clauses.append("timestamp >= ?")
+            parameters.append(since)
+        if until:
+            clauses.append("timestamp < ? AND timestamp != ''")
+            parameters.append(until)
+        return " AND ".join(clauses), parameters
+
+    def allowed_positions(self, author=None, since=None, until=None):
+        clause, parameters = self.filter_clause(author, since, until)
+        if not clause:
+            return None
+        rows = self.docstore.execute(f"SELECT position FROM documents WHERE {clause} ORDER BY position", parameters)
+        return np.array([position for (position,) in rows], dtype=np.int64)
+
+    def newest(self, k, author=None, since=None, until=None):
+        clause, parameters = self.filter_clause(author, since, until)
+        rows = self.docstore.execute(
+            f"SELECT position FROM documents WHERE {clause} ORDER BY timestamp DESC LIMIT ?", parameters + [k],
+        )
+        return [position for (position,) in rows]
+
+    def keyword_search(self, query, k, author=None, since=None, until=None):
+        # Any query token may match, FTS5's bm25() ranks (lower is better)
+        tokens = sorted(set(tokenize(query)))
+        if not tokens:
+            return []
+        clause, parameters = self.filter_clause(author, since, until)
+        rows = self.docstore.execute(
+            "SELECT keywords.rowid FROM keywords "
+            + ("JOIN documents ON documents.position = keywords.rowid " if clause else "")
+            + "WHERE keywords MATCH ? " + (f"AND {clause} " if clause else "")
+            + "ORDER BY bm25(keywords) LIMIT ?",
+            [' OR '.join('"' + token.replace('"', '""') + '"' for token in tokens)] + parameters + [k],
+        )
+        return [position for (position,) in rows]
+
+    def parts(self):
+        # (index, position of its first vector) for the base and the delta
+        offset = 0
+        for index in (self.index, self.delta):
+            if index is not None and index.ntotal:
+                yield index, offset
+                offset += index.ntotal
+
+    def vector_search(self, vector, k, allowed=None):
+        # The k nearest of the base and the delta by L2 distance, delta positions follow the base's. HNSW and IVF
+        # searches behind a selective filter find few of the allowed vectors: up to EXACT_FILTER of them are
+        # compared exactly, for more the search widens by the share the filter passes.
+        vector = np.asarray([vector], dtype=np.float32)
+        if allowed is not None and len(allowed) <= EXACT_FILTER:
+            return self.exact_search(vector, k, np.sort(allowed))
+        selectivity = len(allowed) / self.ntotal if allowed is not None else 1.0
+        found = []
+        for index, offset in self.parts():
+            selector = None
+            if allowed is not None:
+                ids = allowed[(allowed >= offset) & (allowed < offset + index.ntotal)] - offset
+                if not len(ids):
+                    continue
+                selector = faiss.IDSelectorBatch(ids.astype(np.int64))
+            params = search_parameters(index, selector, self.nprobe, self.ef_search, selectivity)
+            distances, positions = index.search(vector, min(k, index.ntotal), params=params)
+            found.extend(
+                (float(distance), int(position) + offset)
+                for distance, position in zip(distances[0], positions[0]) if position >= 0
+            )
+        return [position for _, position in sorted(found)[:k]]
+
+    def exact_search(self, vector, k, allowed):
+        vectors = []
+        for index, offset in self.parts():
+            ids = allowed[(allowed >= offset) & (allowed < offset + index.ntotal)]
+            if len(ids):
+                vectors.append(reconstruct(index, ids - offset))
+        if not vectors:
+            return []
+        distances = ((np.vstack(vectors) - vector) ** 2).sum(axis=1)
+        return allowed[np.argsort(distances, kind='stable')[:k]].tolist()
+
+    def search(self, query, k=4, author=None, since=None, until=None, fetch_k=50, vector=None):
+        # Hybrid retrieval: BM25 and vector rankings restricted to the tweets that pass the author/date filters,
+        # merged with reciprocal rank fusion. `vector` is the query's embedding when the caller already has it.
+        if not self.ntotal:
+            return []
+        if vector is None and query.strip():
+            vector = self.embeddings.embed_query(query)
+        with self.lock:
+            allowed = self.allowed_positions(author, since, until)
+            if allowed is not None and not len(allowed):
+                return []
+            if vector is None:
+                if allowed is None:
+                    return []
+                # Only filters were given, newest tweets first
+                return self.fetch(self.newest(k, author, since, until))
+            rankings = [
+                self.vector_search(vector, fetch_k, allowed), self.keyword_search(query, fetch_k, author, since, until),
+            ]
+            return self.fetch(reciprocal_rank_fusion(rankings)[:k])
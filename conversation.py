@@ -0,0 +1,76 @@
+import hashlib
+import json
+
+from documents import count_tokens
+
+SUMMARY_PROMPT = "Earlier in this conversation the user asked: {questions}"
+
+
+def document_key(document):
+    ids = document.metadata.get('ids') or document.metadata.get('id')
+    if ids:
+        return tuple(ids) if isinstance(ids, list) else ids
+    return document.page_content
+
+
+class ConversationMemory:
+    # Recent turns as chat messages, newest kept first within max_tokens. Older turns are folded into a one-line
+    # summary of the questions asked, so follow-ups keep their thread without resending old answers. Tweets already
+    # quoted by a remembered turn are not quoted again, the model still has them in the history.
+    def __init__(self, max_tokens=3000, summary_tokens=200):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.turns = []
+        self.summary = []
+
+    @property
+    def tokens(self):
+        return sum(turn['tokens'] for turn in self.turns)
+
+    def seen(self):
+        return {key for turn in self.turns for key in turn['documents']}
+
+    def unseen(self, documents):
+        seen = self.seen()
+        fresh = []
+        for document in documents:
+            key = document_key(document)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(document)
+        return fresh
+
+    def messages(self):
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": SUMMARY_PROMPT.format(questions="; ".join(self.summary))})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn['user']})
+            messages.append({"role": "assistant", "content": turn['assistant']})
+        return messages
+
+    def digest(self):
+        # The questions and answers so far, '' for a fresh conversation. Part of the answer cache key, so a follow-up
+        # is only answered from the cache after the same conversation. The quoted tweets are left out, they follow
+        # from the questions and the index version, and a turn answered from the cache quotes none.
+        if not self.turns and not self.summary:
+            return ''
+        remembered = [self.summary, [[turn['question'], turn['assistant']] for turn in self.turns]]
+        return hashlib.sha256(json.dumps(remembered).encode('utf-8')).hexdigest()
+
+    def add(self, question, user_message, answer, documents):
+        self.turns.append({
+            'question': question,
+            'user': user_message,
+            'assistant': answer,
+            'documents': [document_key(document) for document in documents],
+            'tokens': count_tokens(user_message) + count_tokens(answer),
+        })
+        while len(self.turns) > 1 and self.tokens > self.max_tokens:
+            self.summary.append(self.turns.pop(0)['question'])
+        while len(self.summary) > 1 and count_tokens("; ".join(self.summary)) > self.summary_tokens:
+            self.summary.pop(0)
+
+    def clear(self):
+        self.turns = []
+        self.summary = []
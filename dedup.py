@@ -0,0 +1,111 @@
+import re
+import zlib
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1
+RETWEET_PREFIX = re.compile(r"^rt @\w+:?\s*")
+URL = re.compile(r"https?://\S+|www\.\S+")
+WORD = re.compile(r"[#@]?\w+")
+
+
+def canonical_text(text):
+    # Snapshots of the same tweet differ in retweet prefixes, shortened links and spacing
+    text = URL.sub(' ', RETWEET_PREFIX.sub('', text.lower().strip()))
+    return ' '.join(WORD.findall(text))
+
+
+class Deduplicator:
+    # Near-duplicate clustering with MinHash signatures and LSH banding. Exact duplicates (after canonical_text)
+    # share one signature, the rest are bucketed per band of `rows` signature values; records sharing a bucket with
+    # an earlier record are merged into its cluster when their estimated Jaccard similarity reaches `threshold`.
+    # Each record is compared with one bucket representative per band, so the cost grows as n log n, not n^2.
+    def __init__(self, threshold=0.7, num_perm=128, bands=16, shingle_size=3, seed=1, chunk_size=2000):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.chunk_size = chunk_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.band_weights = rng.integers(1, 1 << 62, self.rows, dtype=np.uint64) | np.uint64(1)
+
+    def shingles(self, text):
+        words = text.split()
+        if len(words) <= self.shingle_size:
+            return {text}
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signatures(self, texts):
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), self.chunk_size):
+            hashes, owners = [], []
+            for row, text in enumerate(texts[start:start + self.chunk_size]):
+                shingles = self.shingles(text)
+                hashes.extend(zlib.crc32(shingle.encode('utf-8')) & MERSENNE_PRIME for shingle in shingles)
+                owners.extend([row] * len(shingles))
+            # (a * x + b) mod p for every shingle and permutation, then the minimum per record
+            values = (np.array(hashes, dtype=np.uint64)[:, None] * self.a + self.b) % np.uint64(MERSENNE_PRIME)
+            starts = np.flatnonzero(np.r_[True, np.diff(owners) != 0])
+            signatures[start:start + len(starts)] = np.minimum.reduceat(values, starts, axis=0)
+        return signatures
+
+    def clusters(self, texts):
+        # Returns, for every text, the index of the first text of its cluster
+        # Link-only and emoji-only tweets have no words left, they are compared by their raw text instead of all
+        # being exact duplicates of ''
+        texts = [canonical_text(text) or text.strip() for text in texts]
+        first_seen = {}
+        exact = np.array([first_seen.setdefault(text, i) for i, text in enumerate(texts)], dtype=np.int64)
+        unique = np.flatnonzero(exact == np.arange(len(texts)))
+        parent = np.arange(len(texts))
+        if len(unique) > 1:
+            signatures = self.signatures([texts[i] for i in unique])
+            for band in range(self.bands):
+                rows = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+                keys = (rows * self.band_weights).sum(axis=1)
+                order = np.argsort(keys, kind='stable')
+                starts = np.r_[True, keys[order][1:] != keys[order][:-1]]
+                representatives = order[np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))]
+                members = order[representatives != order]
+                for member, representative in zip(members, representatives[representatives != order]):
+                    if np.mean(signatures[member] == signatures[representative]) >= self.threshold:
+                        self.union(parent, unique[member], unique[representative])
+        roots = np.array([self.find(parent, i) for i in exact])
+        return roots
+
+    def find(self, parent, i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, parent, i, j):
+        i, j = self.find(parent, i), self.find(parent, j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+
+    def collapse(self, records, prefer=None):
+        # Keeps one record per cluster: one `prefer` accepts if any (e.g. already indexed), else the first that is
+        # not a retweet, else the first. Returns the kept records and the counts behind the reduction ratio.
+        records = list(records)
+        roots = self.clusters([record.get('text', '') for record in records]) if records else []
+        clusters = {}
+        for i, root in enumerate(roots):
+            clusters.setdefault(root, []).append(i)
+
+        def rank(i):
+            text = records[i].get('text', '').lower()
+            return (not (prefer is not None and prefer(records[i])), text.startswith('rt @'), i)
+
+        kept = sorted(min(members, key=rank) for members in clusters.values())
+        stats = {
+            'records': len(records),
+            'kept': len(kept),
+            'reduction': 1 - len(kept) / len(records) if records else 0.0,
+        }
+        return [records[i] for i in kept], stats
@@ -0,0 +1,71 @@
+from langchain_core.documents import Document
+
+try:
+    import tiktoken
+    ENCODING = tiktoken.get_encoding('cl100k_base')
+except Exception:  # tiktoken missing, or its encoding files can't be fetched offline
+    ENCODING = None
+
+METADATA_FIELDS = ('id', 'author', 'timestamp', 'scraped_at')
+
+
+def count_tokens(text):
+    if ENCODING is not None:
+        return len(ENCODING.encode(text))
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def record_document(record):
+    metadata = {field: record[field] for field in METADATA_FIELDS if record.get(field)}
+    return Document(page_content=record['text'], metadata=metadata)
+
+
+def pack_documents(records, max_tokens):
+    # Consecutive tweets by the same author (threads, or a profile timeline) share a document while they fit
+    documents = []
+    texts, ids, author, timestamp, tokens = [], [], None, None, 0
+    for record in records:
+        record_tokens = count_tokens(record['text'])
+        if texts and (record.get('author') != author or tokens + record_tokens > max_tokens):
+            documents.append(packed_document(texts, ids, author, timestamp))
+            texts, ids, tokens = [], [], 0
+        if not texts:
+            author, timestamp = record.get('author'), record.get('timestamp')
+        texts.append(record['text'])
+        if record.get('id'):
+            ids.append(record['id'])
+        tokens += record_tokens
+    if texts:
+        documents.append(packed_document(texts, ids, author, timestamp))
+    return documents
+
+
+def packed_document(texts, ids, author, timestamp):
+    metadata = {'ids': ids}
+    if author:
+        metadata['author'] = author
+    if timestamp:
+        metadata['timestamp'] = timestamp
+    return Document(page_content="\n\n".join(texts), metadata=metadata)
+
+
+def build_documents(records, pack_tokens=None):
+    # One document per tweet, or per run of same-author tweets up to pack_tokens when packing is enabled
+    records = [record for record in records if record.get('text', '').strip()]
+    if pack_tokens:
+        return pack_documents(records, pack_tokens)
+    return [record_document(record) for record in records]
+
+
+def format_context(documents):
+    # Compact "@author (time): text" lines instead of Document reprs in the prompt
+    lines = []
+    for document in documents:
+        author = document.metadata.get('author')
+        timestamp = document.metadata.get('timestamp')
+        prefix = ''
+        if author:
+            prefix = f"@{author} ({timestamp}): " if timestamp else f"@{author}: "
+        lines.append(prefix + document.page_content)
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+import array
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from embeddings import embedding_model_name
+
+CACHE_PATH = 'embedding_cache.sqlite'
+WHITESPACE = re.compile(r'\s+')
+LOOKUP_BATCH = 500  # stays under SQLite's bound parameter limit
+
+
+def normalize_text(text):
+    return WHITESPACE.sub(' ', text).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    # Wraps an embedding backend with an on-disk cache keyed by sha256(model, normalised text). Only cache misses
+    # reach the backend, duplicates inside one call are embedded once, and the least recently used entries are
+    # evicted once the cache holds more than max_entries vectors.
+    def __init__(self, embeddings, path=CACHE_PATH, max_entries=500000, model=None):
+        self.embeddings = embeddings
+        self.model = model or embedding_model_name(embeddings)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)')
+        self.connection.commit()
+        # Kept up to date by store and evict so eviction doesn't count the table on every call
+        (self.count,) = self.connection.execute('SELECT COUNT(*) FROM embeddings').fetchone()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def key(self, text, kind='document'):
+        # Queries get their own keys since some backends embed them differently from documents
+        return hashlib.sha256(f"{self.model}\0{kind}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def lookup(self, keys):
+        found = {}
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            rows = self.connection.execute(
+                'SELECT key, vector FROM embeddings WHERE key IN (%s)' % ','.join('?' * len(batch)), batch
+            )
+            for key, blob in rows:
+                vector = array.array('f')
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+
+    def store(self, vectors, now):
+        # Another thread may have stored the same text since the lookup, its row is kept and not counted twice
+        inserted = self.connection.executemany(
+            'INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)',
+            [(key, array.array('f', vector).tobytes(), now) for key, vector in vectors.items()],
+        ).rowcount
+        self.count += max(inserted, 0)
+
+    def touch(self, keys, now):
+        self.connection.executemany('UPDATE embeddings SET last_used = ? WHERE key = ?', [(now, key) for key in keys])
+
+    def evict(self):
+        if self.count > self.max_entries:
+            self.count -= self.connection.execute(
+                'DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)',
+                (self.count - self.max_entries,),
+            ).rowcount
+
+    def embed(self, texts, kind, embed_missing):
+        keys = [self.key(text, kind) for text in texts]
+        unique = dict(zip(keys, texts))
+        with self.lock:
+            cached = self.lookup(list(unique))
+        missing = {key: text for key, text in unique.items() if key not in cached}
+
+        # The backend call runs outside the lock so concurrent index builds and queries don't queue behind it
+        vectors = embed_missing(list(missing.values())) if missing else []
+        # Stored as float32, round fresh vectors the same way so hits and misses return identical values
+        vectors = [array.array('f', vector).tolist() for vector in vectors]
+        cached.update(zip(missing, vectors))
+
+        with self.lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            now = time.time()
+            self.store(dict(zip(missing, vectors)), now)
+            self.touch([key for key in unique if key not in missing], now)
+            self.evict()
+            self.connection.commit()
+        return [cached[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self.embed(texts, 'document', self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self.embed([text], 'query', lambda texts: [self.embeddings.embed_query(texts[0])])[0]
@@ -0,0 +1,122 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_BACKEND = os.environ.get('TWEET_EMBEDDINGS', 'openai')
+OPENAI_EMBEDDING_MODEL = 'text-embedding-ada-002'
+LOCAL_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+TOKEN = re.compile(r"[#@]?\w+")
+HASH_PRIME = np.uint64(1099511628211)
+BIGRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def mix(hashes):
+    # splitmix64 finaliser, spreads the polynomial hash over all 64 bits before taking buckets and signs
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def embedding_model_name(embeddings):
+    return getattr(embeddings, 'model', None) or getattr(embeddings, 'model_name', None) or type(embeddings).__name__
+
+
+class HashingEmbeddings(Embeddings):
+    # Offline bag-of-words vectors: unigrams and bigrams hashed into n_features signed buckets, log-scaled and
+    # L2-normalised. Each batch of texts is split into words by one regex per text, everything else is NumPy: a
+    # polynomial hash over the bytes of all words at once, bigram hashes combined from their words' hashes, and
+    # sums over the touched cells only. NumPy releases the GIL for those steps, so batches overlap in the thread pool.
+    # Nothing is memoised between batches, memory stays flat however many distinct words a build sees.
+    # No model download and no network, so it works on air-gapped nodes.
+    def __init__(self, n_features=1024, batch_size=2048, workers=None):
+        self.n_features = n_features
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.model = f"hashing-v2-{n_features}"
+
+    def hash_words(self, words):
+        # 64-bit hash of each word's UTF-8 bytes, arithmetic wraps modulo 2**64
+        data = np.frombuffer('\n'.join(words).encode('utf-8'), dtype=np.uint8)
+        separators = np.flatnonzero(data == 10)
+        starts = np.r_[0, separators + 1]
+        ends = np.r_[separators, len(data)]
+        owner = np.cumsum(data == 10)
+        from_end = ends[owner] - np.arange(len(data))
+        powers = np.cumprod(np.full(int(from_end.max()) + 1, HASH_PRIME, dtype=np.uint64))
+        terms = (data.astype(np.uint64) + np.uint64(1)) * powers[from_end]
+        terms[separators] = 0
+        return mix(np.add.reduceat(terms, starts))
+
+    def encode_batch(self, texts):
+        words, counts = [], []
+        for text in texts:
+            found = TOKEN.findall(text.lower())
+            words.extend(found)
+            counts.append(len(found))
+        matrix = np.zeros(len(texts) * self.n_features, dtype=np.float32)
+        if words:
+            rows = np.repeat(np.arange(len(texts)), counts)
+            unigrams = self.hash_words(words)
+            # Bigrams are consecutive words of the same text
+            pairs = np.flatnonzero(rows[1:] == rows[:-1])
+            bigrams = mix(unigrams[pairs] * BIGRAM_MULTIPLIER + unigrams[pairs + 1])
+            hashes = np.concatenate([unigrams, bigrams])
+            rows = np.concatenate([rows, rows[pairs]])
+            signs = np.where(hashes >> np.uint64(63), 1.0, -1.0)
+            flat = rows * self.n_features + (hashes % np.uint64(self.n_features)).astype(np.intp)
+            # Only the touched cells are summed, scaled and normalised, the rest of the matrix stays zero
+            cells, inverse = np.unique(flat, return_inverse=True)
+            values = np.bincount(inverse, weights=signs)
+            values = np.sign(values) * np.log1p(np.abs(values))
+            norms = np.sqrt(np.bincount(cells // self.n_features, weights=values ** 2, minlength=len(texts)))
+            matrix[cells] = values / np.maximum(norms[cells // self.n_features], 1e-12)
+        return matrix.reshape(len(texts), self.n_features)
+
+    def encode(self, texts):
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            return self.encode_batch(texts) if texts else np.zeros((0, self.n_features), dtype=np.float32)
+        with ThreadPoolExecutor(self.workers) as executor:
+            return np.vstack(list(executor.map(self.encode_batch, batches)))
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.encode_batch([text])[0].tolist()
+
+
+class ApiEmbeddings(Embeddings):
+    # OpenAI embeddings through the shared ApiClient: a large build goes out as concurrent batches under its rate
+    # limits, and queries from different threads that arrive together share one request
+    def __init__(self, client, model=OPENAI_EMBEDDING_MODEL):
+        self.client = client
+        self.model = model
+
+    def embed_documents(self, texts):
+        return self.client.embed(texts, self.model)
+
+    def embed_query(self, text):
+        return self.client.embed([text], self.model)[0]
+
+
+def get_embeddings(backend=EMBEDDING_BACKEND, api_key="sk-xxx", base_url=None):
+    if backend == 'openai':
+        from api_client import get_client
+        return ApiEmbeddings(get_client(api_key, base_url))
+    if backend == 'hashing':
+        return HashingEmbeddings()
+    if backend == 'local':
+        # CPU-only sentence-transformers model, needs the sentence-transformers package and the model files
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=LOCAL_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'batch_size': 256, 'normalize_embeddings': True},
+        )
+    raise ValueError(f"Unknown embedding backend: {backend}")
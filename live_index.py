@@ -0,0 +1,96 @@
+import asyncio
+import queue
+import threading
+import time
+
+
+class LiveIndexer(threading.Thread):
+    # Consumer side of the scraper -> chat index pipeline. The scraper puts each saved batch of tweet records on a
+    # bounded queue, this thread merges queued batches into groups of up to batch_size (waiting at most max_delay
+    # for more), embeds them and adds them to the live TweetIndex, so the chat can retrieve them seconds after
+    # capture. A full queue makes the scraper wait instead of piling up records faster than they can be embedded.
+    # The index is saved every save_interval seconds and when the indexer stops; a save first merges the index's
+    # delta into its base once that is due, here rather than on the chat's next open.
+    def __init__(self, tweet_index, maxsize=64, batch_size=256, max_delay=0.5, save_interval=60.0,
+                 on_indexed=None, on_error=None):
+        super().__init__(name='live-indexer', daemon=True)
+        self.tweet_index = tweet_index
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.save_interval = save_interval
+        self.on_indexed = on_indexed or (lambda added, lag: None)
+        self.on_error = on_error or (lambda error: None)
+        self.stopping = threading.Event()
+        self.indexed = 0
+        self.lag = 0.0
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+
+    def offer(self, records):
+        # Blocks while the queue is full, gives up once the indexer is stopping
+        item = (time.monotonic(), list(records))
+        while not self.stopping.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def put(self, records):
+        # Backpressure for the scraper's event loop: the wait for queue space happens on an executor thread
+        if records:
+            await asyncio.get_running_loop().run_in_executor(None, self.offer, records)
+
+    def take(self):
+        # One queued batch plus whatever else arrives within max_delay, up to batch_size records
+        try:
+            queued_at, records = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return None, []
+        deadline = time.monotonic() + self.max_delay
+        while len(records) < self.batch_size:
+            try:
+                _, more = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            records.extend(more)
+        return queued_at, records
+
+    def run(self):
+        if self.tweet_index.needs_merge():
+            self.save()
+        while not (self.stopping.is_set() and self.queue.empty()):
+            queued_at, records = self.take()
+            if records:
+                try:
+                    added = self.tweet_index.add_records(records)
+                except Exception as e:
+                    self.on_error(str(e))
+                else:
+                    self.indexed += added
+                    self.unsaved += added
+                    self.lag = time.monotonic() - queued_at
+                    self.on_indexed(added, self.lag)
+            if self.unsaved and time.monotonic() - self.saved_at >= self.save_interval:
+                self.save()
+        if self.unsaved:
+            self.save()
+
+    def save(self):
+        try:
+            if self.tweet_index.needs_merge():
+                self.tweet_index.merge()
+            else:
+                self.tweet_index.save()
+        except Exception as e:
+            self.on_error(str(e))
+        self.unsaved = 0
+        self.saved_at = time.monotonic()
+
+    def stop(self, wait=True):
+        # Queued batches are still indexed and saved before the thread ends
+        self.stopping.set()
+        if wait and self.is_alive():
+            self.join()
@@ -0,0 +1,65 @@
+class AdaptivePacer:
+    # Adjusts the scroll interval from what the previous scroll produced: shorter while new tweets keep arriving
+    # quickly, longer when a scroll yields nothing or the feed answers slowly (rate limiting), and reports the
+    # feed as exhausted after `patience` empty scrolls in a row. Every time a scroll comes back empty right after a
+    # productive one the floor is raised, so the pacer settles just above the feed's rate limit instead of oscillating.
+    def __init__(self, interval, min_interval=0.25, max_interval=30.0, speedup=0.75, backoff=2.0, patience=6, slow_load=3.0):
+        self.interval = min(max(interval, min_interval), max_interval)
+        self.min_interval = min_interval
+        self.floor = min_interval
+        self.max_interval = max_interval
+        self.speedup = speedup
+        self.backoff = backoff
+        self.patience = patience
+        self.slow_load = slow_load
+        self.empty_scrolls = 0
+        self.scrolled_at = None
+        self.window_items = 0
+        self.window_latency = None
+        self.last_productive_interval = None
+
+    @property
+    def exhausted(self):
+        return self.empty_scrolls >= self.patience
+
+    def scrolled(self, now):
+        # Closes the window opened by the previous scroll and opens a new one
+        if self.scrolled_at is not None:
+            self.adjust(self.window_items, self.window_latency)
+        self.scrolled_at = now
+        self.window_items = 0
+        self.window_latency = None
+
+    def observe(self, new_items, now):
+        if new_items <= 0:
+            return
+        if self.window_items == 0 and self.scrolled_at is not None:
+            self.window_latency = now - self.scrolled_at
+        self.window_items += new_items
+
+    def adjust(self, new_items, load_latency):
+        if new_items == 0:
+            if self.empty_scrolls == 0 and self.last_productive_interval is not None:
+                self.floor = min(self.max_interval, max(self.last_productive_interval, self.floor / self.speedup))
+            self.empty_scrolls += 1
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        elif load_latency is not None and load_latency > self.slow_load:
+            self.empty_scrolls = 0
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        else:
+            self.empty_scrolls = 0
+            self.last_productive_interval = self.interval
+            self.interval = max(self.floor, self.interval * self.speedup)
+
+
+class FixedPacer:
+    # Same interface as AdaptivePacer for runs that keep the interval given by the user
+    def __init__(self, interval):
+        self.interval = interval
+        self.exhausted = False
+
+    def scrolled(self, now):
+        pass
+
+    def observe(self, new_items, now):
+        pass
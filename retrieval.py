@@ -0,0 +1,32 @@
+import re
+
+TOKEN = re.compile(r"[#@]?\w+")
+OPERATOR = re.compile(r"\b(from|since|until):(\S+)", re.IGNORECASE)
+RRF_K = 60
+
+
+def tokenize(text):
+    # "#Tesla" matches both "#tesla" and "tesla", "@elonmusk" both "@elonmusk" and "elonmusk"
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if token[0] in '#@' and len(token) > 1:
+            tokens.append(token[1:])
+    return tokens
+
+
+def parse_query(query):
+    # Twitter search operators in the question become filters: from:handle, since:YYYY-MM-DD, until:YYYY-MM-DD
+    filters = {}
+    for name, value in OPERATOR.findall(query):
+        name = name.lower()
+        filters['author' if name == 'from' else name] = value.lstrip('@').lower() if name == 'from' else value
+    return ' '.join(OPERATOR.sub(' ', query).split()), filters
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    scores = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,442 @@
+import argparse
+import asyncio
+import csv
+
+from playwright.async_api import async_playwright
+
+from browser_profile import PROFILE_DIR, close_scraping_context, open_scraping_context
+from pacer import AdaptivePacer, FixedPacer
+from seen_store import SeenTweets
+from text_pipeline import TextNormalizer
+from tweet_store import STORE_DIR, TweetStore
+
+DEFAULT_TWITTER_URL = 'https://twitter.com'
+LINKEDIN_URL = 'https://www.linkedin.com'
+
+STREAM_BINDING = '__scraperPushTweets'
+LOAD_POLL_INTERVAL = 0.25
+
+TWEET_RECORD_JS = r"""
+function tweetRecord(article) {
+    const text = article.querySelector('div[lang]');
+    if (!text) {
+        return null;
+    }
+    const link = article.querySelector('a[href*="/status/"]');
+    const match = link ? link.getAttribute('href').match(/\/([^/]+)\/status\/(\d+)/) : null;
+    const time = article.querySelector('time');
+    const group = article.querySelector('[role="group"]');
+    const metrics = {};
+    if (group && group.getAttribute('aria-label')) {
+        for (const [, count, name] of group.getAttribute('aria-label').matchAll(/(\d[\d,]*)\s+(\w+)/g)) {
+            metrics[name] = parseInt(count.replace(/,/g, ''), 10);
+        }
+    }
+    return {
+        id: match ? match[2] : null,
+        author: match ? match[1] : null,
+        timestamp: time ? time.getAttribute('datetime') : null,
+        text: text.innerText,
+        metrics: metrics,
+    };
+}
+"""
+
+# Collects every tweet on the page in a single round trip instead of one inner_text() call per element
+EXTRACT_TWEETS_JS = """
+() => {
+%s
+    return Array.from(document.querySelectorAll('article')).map(tweetRecord).filter(record => record !== null);
+}
+""" % TWEET_RECORD_JS
+
+# Pushes tweets to Python as they are inserted, batching all mutations of one task into a single binding call.
+# Articles whose text renders after the article itself are picked up through the mutation inside them.
+OBSERVE_TWEETS_JS = """
+(bindingName) => {
+%s
+    const push = window[bindingName];
+    let pending = [];
+    let scheduled = false;
+    const flush = () => {
+        scheduled = false;
+        if (pending.length) {
+            const batch = pending;
+            pending = [];
+            push(batch);
+        }
+    };
+    const collect = article => {
+        if (article.dataset.scraped) {
+            return;
+        }
+        const record = tweetRecord(article);
+        if (record) {
+            article.dataset.scraped = '1';
+            pending.push(record);
+        }
+    };
+    document.querySelectorAll('article').forEach(collect);
+    if (window.__scraperObserver) {
+        window.__scraperObserver.disconnect();
+    }
+    window.__scraperObserver = new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType !== Node.ELEMENT_NODE) {
+                    continue;
+                }
+                const articles = node.tagName === 'ARTICLE' ? [node] : node.querySelectorAll('article');
+                if (articles.length) {
+                    articles.forEach(collect);
+                } else if (node.closest('article')) {
+                    collect(node.closest('article'));
+                }
+            }
+        }
+        if (pending.length && !scheduled) {
+            scheduled = true;
+            setTimeout(flush, 0);
+        }
+    });
+    window.__scraperObserver.observe(document.body, {childList: true, subtree: true});
+    flush();
+}
+""" % TWEET_RECORD_JS
+
+EXTRACT_LINKEDIN_JS = """
+() => Array.from(document.querySelectorAll('.feed-shared-update-v2')).map(post => post.textContent)
+"""
+
+
+async def save_tweets_to_csv(tweets, path='tweets.txt'):
+    with open(path, 'a', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        for tweet in tweets:
+            writer.writerow([tweet])
+
+
+class CsvSink:
+    # Appends one row per tweet text, the format the scraper wrote before the tweet store existed
+    def __init__(self, path='tweets.txt'):
+        self.path = path
+
+    async def write(self, records):
+        await save_tweets_to_csv([record['text'] for record in records], self.path)
+
+    async def close(self):
+        pass
+
+
+class TargetResult:
+    def __init__(self, url):
+        self.url = url
+        self.saved = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"<TargetResult {self.url} failed: {self.error}>"
+        return f"<TargetResult {self.url} saved={self.saved} elapsed={self.elapsed:.1f}s>"
+
+
+class ScraperEngine:
+    def __init__(
+        self,
+        total_run_time,
+        scroll_interval,
+        urls=None,
+        sink=None,
+        headless=True,
+        on_status=None,
+        on_progress=None,
+        concurrency=1,
+        seen=None,
+        mode='poll',
+        adaptive=False,
+        profile_dir=PROFILE_DIR,
+        block_resources=True,
+        indexer=None,
+        normalizer=None,
+    ):
+        self.total_run_time = total_run_time
+        self.scroll_interval = scroll_interval
+        self.urls = [url for url in (urls or []) if url] or [DEFAULT_TWITTER_URL]
+        self.concurrency = max(1, concurrency)
+        self.sink = sink if sink is not None else TweetStore()
+        self.seen = seen if seen is not None else SeenTweets()
+        self.mode = mode
+        self.adaptive = adaptive
+        self.stream_queues = {}
+        self.headless = headless
+        self.profile_dir = profile_dir
+        self.block_resources = block_resources
+        self.indexer = indexer
+        self.normalizer = normalizer if normalizer is not None else TextNormalizer()
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.saved_count = 0
+        self.started_at = None
+
+    def status(self, text):
+        if self.on_status is not None:
+            self.on_status(text)
+
+    async def save(self, records):
+        # Cleaned and enriched (urls, mentions, hashtags, language) in the normaliser's process pool
+        records = await self.normalizer.normalize(records)
+        await self.sink.write(records)
+        # A live chat index gets the same records, waiting here when it falls behind
+        if self.indexer is not None:
+            await self.indexer.put(records)
+        self.saved_count += len(records)
+        if self.on_progress is not None:
+            elapsed = asyncio.get_running_loop().time() - self.started_at
+            self.on_progress(self.saved_count, self.saved_count / elapsed if elapsed > 0 else 0.0)
+        return len(records)
+
+    async def extract_tweet_records(self, page):
+        return await page.evaluate(EXTRACT_TWEETS_JS)
+
+    async def extract_tweets(self, page):
+        return [record['text'] for record in await self.extract_tweet_records(page)]
+
+    async def save_new(self, records):
+        # Only tweets that were never seen before (in this run or earlier ones) reach the sink. They count as seen
+        # once saved, a failed save leaves them new for the next capture.
+        new_records, keys = self.seen.filter_new(records)
+        if not new_records:
+            return 0
+        try:
+            saved = await self.save(new_records)
+        except BaseException:
+            self.seen.release(keys)
+            raise
+        self.seen.commit(keys)
+        self.seen.flush()
+        return saved
+
+    async def capture_new(self, page):
+        return await self.save_new(await self.extract_tweet_records(page))
+
+    async def capture_loaded(self, page, deadline):
+        # The adaptive pacer backs off on slow loads: it polls after a scroll until the tweets show up or the
+        # deadline passes, so the pacer sees how long the feed took rather than the round trip of one extract. A
+        # fixed pacer ignores latency, one extract per interval is enough.
+        if not self.adaptive:
+            return await self.capture_new(page)
+        loop = asyncio.get_running_loop()
+        while True:
+            new_count = await self.capture_new(page)
+            if new_count or loop.time() >= deadline:
+                return new_count
+            await asyncio.sleep(min(LOAD_POLL_INTERVAL, max(0.0, deadline - loop.time())))
+
+    async def stream_tweets(self, page):
+        # Async generator of record batches pushed by an in-page MutationObserver, no DOM polling involved
+        queue = asyncio.Queue()
+        if page not in self.stream_queues:
+            await page.expose_binding(STREAM_BINDING, lambda source, records: self.push_records(page, records))
+        self.stream_queues[page] = queue
+        try:
+            await page.evaluate(OBSERVE_TWEETS_JS, STREAM_BINDING)
+            while True:
+                yield await queue.get()
+        finally:
+            self.stream_queues[page] = None
+
+    def push_records(self, page, records):
+        queue = self.stream_queues.get(page)
+        if queue is not None:
+            queue.put_nowait(records)
+
+    def new_pacer(self):
+        if self.adaptive:
+            return AdaptivePacer(self.scroll_interval)
+        return FixedPacer(self.scroll_interval)
+
+    async def keep_scrolling(self, page, pacer):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(pacer.interval)
+            pacer.scrolled(loop.time())
+            if pacer.exhausted:
+                return
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+
+    async def scrape_twitter(self, page, twitter_url=DEFAULT_TWITTER_URL):
+        await page.goto(twitter_url or DEFAULT_TWITTER_URL, timeout=60000)
+        await page.wait_for_selector('article div[lang]')
+        saved = await self.capture_new(page)
+        pacer = self.new_pacer()
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        while loop.time() - start_time < self.total_run_time:
+            scrolled_at = loop.time()
+            pacer.scrolled(scrolled_at)
+            if pacer.exhausted:
+                self.status(f"No new tweets on {twitter_url}, stopping early")
+                break
+            next_scroll = scrolled_at + pacer.interval
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            new_count = await self.capture_loaded(page, next_scroll)
+            pacer.observe(new_count, loop.time())
+            saved += new_count
+            await asyncio.sleep(max(0.0, next_scroll - loop.time()))
+        return saved
+
+    async def stream_twitter(self, page, twitter_url=DEFAULT_TWITTER_URL):
+        await page.goto(twitter_url or DEFAULT_TWITTER_URL, timeout=60000)
+        await page.wait_for_selector('article div[lang]')
+        saved = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.total_run_time
+
+        # Scrolling only triggers loading, new tweets are saved as soon as the page inserts them
+        pacer = self.new_pacer()
+        scroller = asyncio.create_task(self.keep_scrolling(page, pacer))
+        stream = self.stream_tweets(page)
+        next_batch = asyncio.ensure_future(stream.__anext__())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {next_batch, scroller}, timeout=deadline - loop.time(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if next_batch not in done:
+                    # Run time is over, or the scroller gave up because the feed is exhausted
+                    if scroller.done():
+                        scroller.result()
+                        self.status(f"No new tweets on {twitter_url}, stopping early")
+                    break
+                new_count = await self.save_new(next_batch.result())
+                pacer.observe(new_count, loop.time())
+                saved += new_count
+                next_batch = asyncio.ensure_future(stream.__anext__())
+        finally:
+            scroller.cancel()
+            next_batch.cancel()
+            await asyncio.gather(scroller, next_batch, return_exceptions=True)
+            await stream.aclose()
+        return saved
+
+    async def scrape_linkedin(self, page, output_path='linkedin_posts.txt'):
+        self.status("Scraping LinkedIn posts...")
+        await page.goto(LINKEDIN_URL)
+
+        # Wait for the posts to load
+        await page.wait_for_selector('.feed-shared-update-v2', timeout=60000)
+
+        posts_data = []
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        while loop.time() - start_time < self.total_run_time:
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            await asyncio.sleep(self.scroll_interval)
+
+            posts = await self.normalizer.normalize({'text': post} for post in await page.evaluate(EXTRACT_LINKEDIN_JS))
+            posts_data.extend(post['text'] for post in posts)
+
+        with open(output_path, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Post Content'])
+            for post in posts_data:
+                writer.writerow([post])
+
+        self.status("LinkedIn posts scraped successfully!")
+
+    async def scrape_targets(self, context, urls):
+        # Pages share the context's login cookies and cache, the pool size is the concurrency limit
+        loop = asyncio.get_running_loop()
+        pages = asyncio.Queue()
+        for _ in range(min(self.concurrency, len(urls))):
+            pages.put_nowait(await context.new_page())
+
+        async def scrape_target(url):
+            result = TargetResult(url)
+            page = await pages.get()
+            start_time = loop.time()
+            try:
+                if self.mode == 'stream':
+                    result.saved = await self.stream_twitter(page, url)
+                else:
+                    result.saved = await self.scrape_twitter(page, url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result.error = str(e)
+                self.status(f"Scraping {url} failed: {e}")
+            finally:
+                result.elapsed = loop.time() - start_time
+                pages.put_nowait(page)
+            return result
+
+        return await asyncio.gather(*(scrape_target(url) for url in urls))
+
+    async def run(self, platform='twitter'):
+        self.saved_count = 0
+        self.started_at = asyncio.get_running_loop().time()
+        async with async_playwright() as p:
+            context = await open_scraping_context(
+                p, headless=self.headless, user_data_dir=self.profile_dir, block_resources=self.block_resources
+            )
+            try:
+                if platform == 'linkedin':
+                    await self.scrape_linkedin(await context.new_page())
+                    return []
+                return await self.scrape_targets(context, self.urls)
+            finally:
+                # Also reached when the run is cancelled from the GUI's Stop button
+                await close_scraping_context(context)
+                await self.sink.close()
+                self.normalizer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless social media scraper")
+    parser.add_argument('--run-time', type=int, required=True, help="Total run time per target (seconds)")
+    parser.add_argument('--scroll-interval', type=int, required=True, help="Scroll interval (seconds)")
+    parser.add_argument('--url', action='append', dest='urls', default=[], help="Target URL, may be repeated")
+    parser.add_argument('--url-file', help="File with one target URL per line")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of pages scraping in parallel")
+    parser.add_argument('--output', default=STORE_DIR, help="Tweet store directory the scraped tweets are appended to")
+    parser.add_argument('--csv', help="Append tweet texts to this CSV file instead of the tweet store")
+    parser.add_argument('--platform', choices=['twitter', 'linkedin'], default='twitter')
+    parser.add_argument('--headed', action='store_true', help="Show the Chromium window, e.g. to log in once")
+    parser.add_argument('--profile-dir', default=PROFILE_DIR, help="Persistent browser profile, empty for a throwaway one")
+    parser.add_argument('--load-images', action='store_true', help="Don't block images, media, fonts and trackers")
+    parser.add_argument('--stream', action='store_true', help="Capture tweets as the page inserts them instead of polling")
+    parser.add_argument('--adaptive', action='store_true', help="Adapt the scroll interval to how many new tweets each scroll yields")
+    parser.add_argument('--normalize-workers', type=int, default=None, help="Processes cleaning tweet text, 0 for a thread")
+    parser.add_argument('--seen-file', default='seen_tweets.bin', help="IDs of tweets already captured, kept across runs")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.url_file:
+        with open(args.url_file, encoding='utf-8') as url_file:
+            urls.extend(line.strip() for line in url_file if line.strip())
+
+    engine = ScraperEngine(
+        args.run_time,
+        args.scroll_interval,
+        urls=urls,
+        sink=CsvSink(args.csv) if args.csv else TweetStore(args.output),
+        headless=not args.headed,
+        on_status=print,
+        on_progress=lambda saved, rate: print(f"Saved {saved} tweets ({rate:.2f} tweets/sec)"),
+        concurrency=args.concurrency,
+        seen=SeenTweets(args.seen_file),
+        mode='stream' if args.stream else 'poll',
+        adaptive=args.adaptive,
+        normalizer=TextNormalizer(args.normalize_workers),
+        profile_dir=args.profile_dir or None,
+        block_resources=not args.load_images,
+    )
+    for result in asyncio.run(engine.run(args.platform)):
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import array
+import hashlib
+import os
+import re
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def tweet_key(record):
+    # Tweet ID when the page exposed one, otherwise a hash of the whitespace-normalised text
+    if record.get('id'):
+        source = 'id:' + str(record['id'])
+    else:
+        source = 'text:' + WHITESPACE.sub(' ', record.get('text', '')).strip()
+    digest = hashlib.blake2b(source.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class SeenTweets:
+    # Keys are 64-bit hashes, persisted as a flat array of unsigned longs that only ever grows by appending.
+    # filter_new() claims the keys of the new records until the caller commits them once the records are saved, or
+    # releases them when saving failed, so a failed save never marks its tweets as seen.
+    def __init__(self, path='seen_tweets.bin'):
+        self.path = path
+        self.keys = set()
+        self.claimed = set()
+        self.pending = array.array('Q')
+        if path and os.path.exists(path):
+            stored = array.array('Q')
+            with open(path, 'rb') as seen_file:
+                stored.frombytes(seen_file.read())
+            self.keys.update(stored)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, record):
+        return tweet_key(record) in self.keys
+
+    def filter_new(self, records):
+        # Records neither seen nor claimed by a save still in progress, and their keys
+        new_records, keys = [], []
+        for record in records:
+            key = tweet_key(record)
+            if key not in self.keys and key not in self.claimed:
+                self.claimed.add(key)
+                keys.append(key)
+                new_records.append(record)
+        return new_records, keys
+
+    def commit(self, keys):
+        self.claimed.difference_update(keys)
+        self.keys.update(keys)
+        self.pending.extend(keys)
+
+    def release(self, keys):
+        self.claimed.difference_update(keys)
+
+    def flush(self):
+        if not self.path or not self.pending:
+            return
+        with open(self.path, 'ab') as seen_file:
+            self.pending.tofile(seen_file)
+        self.pending = array.array('Q')
@@ -0,0 +1,162 @@
+from langchain_core.documents import Document
+
+import answer_cache
+from answer import AnswerPipeline
+from answer_cache import AnswerCache, named_tokens, normalize_prompt
+from conversation import ConversationMemory
+from embeddings import HashingEmbeddings
+
+
+def make_cache(tmp_path, **options):
+    return AnswerCache(str(tmp_path / 'answers.sqlite'), **options)
+
+
+def test_normalised_prompt_hits_for_the_same_version(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("What is he saying about Tesla?", 'v1', "answer")
+    assert normalize_prompt("  what is he   saying about tesla ") == "what is he saying about tesla"
+    assert cache.get("what is he saying about tesla", 'v1') == "answer"
+    assert cache.get("what is he saying about tesla", 'v2') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_newer_version_drops_older_answers(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("first", 'v1', "old")
+    cache.put("second", 'v2', "new")
+    assert cache.connection.execute('SELECT COUNT(*) FROM answers').fetchone() == (1,)
+    assert cache.get("first", 'v1') is None
+
+
+def test_answers_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, 'time', lambda: now[0])
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("question", 'v1', "answer")
+    now[0] += 59
+    assert cache.get("question", 'v1') == "answer"
+    now[0] += 2
+    assert cache.get("question", 'v1') is None
+
+
+def test_least_recently_used_evicted_past_max_entries(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, 'time', lambda: now[0])
+    cache = make_cache(tmp_path, max_entries=2)
+    for question in ("a", "b"):
+        now[0] += 1
+        cache.put(question, 'v1', question.upper())
+    now[0] += 1
+    cache.get("a", 'v1')
+    now[0] += 1
+    cache.put("c", 'v1', "C")
+    assert cache.get("a", 'v1') == "A"
+    assert cache.get("b", 'v1') is None
+    assert cache.get("c", 'v1') == "C"
+
+
+def test_named_tokens():
+    assert named_tokens("What does @Elon say about #AI since:2024-01-01? Is Tesla up 5%") == (
+        "#ai 5% @elon since:2024-01-01 tesla"
+    )
+    assert named_tokens("What is he saying? I wonder") == ""
+
+
+def test_similar_question_needs_the_same_named_tokens(tmp_path):
+    # similarity=0 accepts any vector, only the named tokens decide
+    cache = make_cache(tmp_path, embeddings=HashingEmbeddings(), similarity=0.0)
+    cache.put("What is he saying about Tesla?", 'v1', "tesla answer")
+    assert cache.get("What has he been saying about Tesla lately", 'v1') == "tesla answer"
+    assert cache.get("What is he saying about SpaceX?", 'v1') is None
+    assert cache.get("What is he saying about Tesla from:elon", 'v1') is None
+
+
+def test_given_vector_is_used_instead_of_embedding(tmp_path):
+    class Failing:
+        def embed_query(self, text):
+            raise AssertionError("embedded again")
+
+    cache = make_cache(tmp_path, embeddings=Failing(), similarity=0.99)
+    cache.put("What is he saying about Tesla?", 'v1', "answer", vector=[1.0, 0.0])
+    assert cache.get("what's he saying about Tesla", 'v1', vector=[2.0, 0.01]) == "answer"
+
+
+def test_exact_hit_embeds_nothing(tmp_path):
+    class Counting(HashingEmbeddings):
+        calls = 0
+
+        def embed_query(self, text):
+            Counting.calls += 1
+            return super().embed_query(text)
+
+    cache = make_cache(tmp_path, embeddings=Counting())
+    cache.put("What is he saying about Tesla?", 'v1', "answer")
+    calls = Counting.calls
+    assert cache.exact("what is he saying about tesla", 'v1') == "answer"
+    assert cache.exact("What is he saying about SpaceX", 'v1') is None
+    assert Counting.calls == calls
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert cache.similar("What is he saying about SpaceX", 'v1') is None
+    assert (Counting.calls, cache.misses) == (calls + 1, 1)
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+class OneTweetIndex:
+    # Stand-in for TweetIndex: every search finds the same tweet
+    version = 'v1'
+    ntotal = 1
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def search(self, query, k, vector=None, **filters):
+        return [Document(page_content="Tesla is up", metadata={'id': '1'})]
+
+
+class EchoClient:
+    def __init__(self):
+        self.completions = 0
+
+    def stream_chat(self, messages, model):
+        self.completions += 1
+        yield messages[-1]['content'][-20:]
+
+
+def test_pipeline_exact_hit_skips_the_embedding(tmp_path):
+    embeddings = CountingEmbeddings()
+    client = EchoClient()
+    pipeline = AnswerPipeline(
+        client, OneTweetIndex(embeddings), cache=make_cache(tmp_path, embeddings=embeddings)
+    )
+    first = pipeline.answer("What is he saying about Tesla?")
+    calls = embeddings.calls
+    assert pipeline.answer("what is he saying about tesla") == first
+    assert (embeddings.calls, client.completions) == (calls, 1)
+    assert 'cache' in pipeline.timings
+
+
+def test_follow_ups_are_cached_per_conversation(tmp_path):
+    client = EchoClient()
+    cache = make_cache(tmp_path)
+    first, second = ConversationMemory(), ConversationMemory()
+    for memory in (first, second):
+        pipeline = AnswerPipeline(client, OneTweetIndex(HashingEmbeddings()), cache=cache, memory=memory)
+        pipeline.answer("What is he saying about Tesla?")
+        pipeline.answer("And SpaceX?")
+    assert client.completions == 2
+    assert first.digest() == second.digest() != ''
+
+    # The same follow-up after a different conversation is answered again
+    pipeline = AnswerPipeline(client, OneTweetIndex(HashingEmbeddings()), cache=cache, memory=ConversationMemory())
+    pipeline.answer("What is he saying about Starlink?")
+    pipeline.answer("And SpaceX?")
+    assert client.completions == 4
@@ -0,0 +1,188 @@
+import json
+import os
+
+import numpy as np
+
+from ann_index import MAX_EF_SEARCH, build_index, reconstruct, search_parameters
+from chat_index import TweetIndex
+from embeddings import HashingEmbeddings
+from tweet_store import TweetStore
+
+WORDS = "tesla rocket launch free speech mars starship battery factory engine orbit booster".split()
+
+
+def records(start, count):
+    return [
+        {
+            'id': str(i), 'author': f"user{i % 3}", 'timestamp': f"2024-01-{1 + i % 28:02d}T12:00:00.000Z",
+            'text': f"tweet {i} says {WORDS[i % len(WORDS)]} {WORDS[i * 7 % len(WORDS)]} number{i}",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def open_index(tmp_path, **options):
+    store = TweetStore(str(tmp_path / 'store'))
+    tweet_index = TweetIndex(HashingEmbeddings(), str(tmp_path / 'index'), store, **options)
+    return tweet_index, tweet_index.open()
+
+
+def manifest(tmp_path):
+    with open(tmp_path / 'index' / 'manifest.json', encoding='utf-8') as manifest_file:
+        return json.load(manifest_file)
+
+
+def test_reopen_without_changes_embeds_nothing(tmp_path):
+    TweetStore(str(tmp_path / 'store')).append_records(records(0, 50))
+    tweet_index, added = open_index(tmp_path)
+    assert added == 50 and tweet_index.ntotal == 50
+    tweet_index, added = open_index(tmp_path)
+    assert added == 0 and tweet_index.ntotal == 50
+    assert tweet_index.delta is None
+    assert [document.metadata['id'] for document in tweet_index.search("number7 says", k=1)] == ['7']
+
+
+def test_new_tweets_go_to_the_delta_without_rewriting_the_base(tmp_path):
+    store = TweetStore(str(tmp_path / 'store'))
+    store.append_records(records(0, 50))
+    open_index(tmp_path)
+    base = manifest(tmp_path)['file']
+    store.append_records(records(50, 1))
+    tweet_index, added = open_index(tmp_path)
+    assert added == 1
+    assert manifest(tmp_path)['file'] == base and manifest(tmp_path)['delta']
+    assert (tweet_index.base_size, tweet_index.delta.ntotal) == (50, 1)
+    assert [document.metadata['id'] for document in tweet_index.search("number50", k=1)] == ['50']
+    assert open_index(tmp_path)[1] == 0
+
+
+def test_added_but_unsaved_tweets_are_indexed_again_once_on_reopen(tmp_path):
+    store = TweetStore(str(tmp_path / 'store'))
+    store.append_records(records(0, 20))
+    tweet_index, _ = open_index(tmp_path)
+    store.append_records(records(20, 5))
+    assert tweet_index.add_records(records(20, 5)) == 5
+    tweet_index.docstore.commit()  # rows past the saved manifest, as if the process died before its next save
+
+    reopened, added = open_index(tmp_path)
+    assert added == 5 and reopened.ntotal == 25
+    assert reopened.docstore.execute("SELECT COUNT(*) FROM documents").fetchone() == (25,)
+    assert reopened.docstore.execute("SELECT COUNT(*) FROM records").fetchone() == (25,)
+    assert len({document.metadata['id'] for document in reopened.search("tweet says", k=25)}) == 25
+
+
+def test_live_added_and_saved_tweets_are_not_embedded_again(tmp_path):
+    store = TweetStore(str(tmp_path / 'store'))
+    store.append_records(records(0, 20))
+    tweet_index, _ = open_index(tmp_path)
+    store.append_records(records(20, 5))
+    tweet_index.add_records(records(20, 5))
+    tweet_index.save()
+    assert manifest(tmp_path)['offsets'] == {
+        name: os.path.getsize(os.path.join(store.directory, name)) for name in manifest(tmp_path)['offsets']
+    }
+    reopened, added = open_index(tmp_path)
+    assert added == 0 and reopened.ntotal == 25
+
+
+def test_merge_folds_the_delta_into_a_new_base(tmp_path):
+    store = TweetStore(str(tmp_path / 'store'))
+    store.append_records(records(0, 40))
+    tweet_index, _ = open_index(tmp_path, merge_size=10)
+    tweet_index.add_records(records(40, 9))
+    assert not tweet_index.needs_merge()
+    tweet_index.add_records(records(49, 1))
+    assert tweet_index.needs_merge()
+    before = [document.metadata['id'] for document in tweet_index.search("number45 factory", k=5)]
+    old_base = manifest(tmp_path)['file']
+
+    tweet_index.merge()
+    assert (tweet_index.base_size, tweet_index.delta.ntotal) == (50, 0)
+    assert manifest(tmp_path)['file'] != old_base and manifest(tmp_path)['delta'] is None
+    assert [name for name in os.listdir(tmp_path / 'index') if name.startswith(('index', 'delta', 'merge'))] == [
+        manifest(tmp_path)['file']
+    ]
+    assert [document.metadata['id'] for document in tweet_index.search("number45 factory", k=5)] == before
+    assert open_index(tmp_path, merge_size=10)[0].ntotal == 50
+
+
+def test_merge_builds_the_configured_ann_index(tmp_path):
+    TweetStore(str(tmp_path / 'store')).append_records(records(0, 30))
+    tweet_index, _ = open_index(tmp_path, index_type='hnsw', hnsw_m=8)
+    assert type(tweet_index.index).__name__ == 'IndexHNSWFlat'
+    tweet_index.add_records(records(30, 10))
+    tweet_index.merge()
+    assert tweet_index.base_size == 40
+    assert [document.metadata['id'] for document in tweet_index.search("number35", k=1)] == ['35']
+
+
+def test_selective_filter_on_an_ann_index_still_finds_k(tmp_path):
+    TweetStore(str(tmp_path / 'store')).append_records(records(0, 600))
+    tweet_index, _ = open_index(tmp_path, index_type='hnsw', hnsw_m=4, ef_search=8)
+    tweet_index.add_records(records(600, 30))  # in the delta
+    allowed = np.array(list(range(0, 600, 29)) + [605, 615], dtype=np.int64)
+    vector = np.asarray(tweet_index.embeddings.embed_query("tweet says rocket"), dtype=np.float32)
+
+    found = tweet_index.vector_search(vector, 10, allowed)
+    vectors = np.vstack([tweet_index.index.reconstruct_n(0, 600), tweet_index.delta.reconstruct_n(0, 30)])
+    distances = ((vectors[allowed] - vector) ** 2).sum(axis=1)
+    assert len(found) == 10
+    assert np.allclose(sorted(((vectors[found] - vector) ** 2).sum(axis=1)), np.sort(distances)[:10])
+
+
+def test_filtered_search_parameters_widen_with_selectivity():
+    vectors = np.random.default_rng(0).random((2000, 8), dtype=np.float32)
+    hnsw = build_index('HNSW8', vectors)
+    assert search_parameters(hnsw, ef_search=64, selectivity=0.1).efSearch == 640
+    assert search_parameters(hnsw, ef_search=64, selectivity=1e-6).efSearch == MAX_EF_SEARCH
+    ivf = build_index('IVF16,Flat', vectors)
+    assert search_parameters(ivf, nprobe=4, selectivity=0.5).nprobe == 8
+    assert search_parameters(ivf, nprobe=4, selectivity=0.01).nprobe == 16
+    assert np.allclose(reconstruct(ivf, [3, 1999]), vectors[[3, 1999]])
+
+
+def keyword_index(directory, texts, authors=None):
+    store = TweetStore(str(directory / 'store'))
+    store.append_records([
+        {'id': str(i), 'author': authors[i] if authors else None, 'text': text} for i, text in enumerate(texts)
+    ])
+    tweet_index = TweetIndex(HashingEmbeddings(), str(directory / 'index'), store, dedupe=False)
+    tweet_index.open()
+    return tweet_index
+
+
+def test_bm25_ranks_rarer_and_denser_matches_first(tmp_path):
+    tweet_index = keyword_index(tmp_path, [
+        "tesla tesla tesla earnings",
+        "tesla earnings call notes with many other words in it",
+        "spacex launch",
+        "earnings season for everyone",
+    ])
+    assert tweet_index.keyword_search("tesla", 10) == [0, 1]
+    assert tweet_index.keyword_search("spacex tesla", 10)[0] == 2
+    assert tweet_index.keyword_search("nothing matches", 10) == []
+
+
+def test_bm25_search_respects_filters_and_k(tmp_path):
+    tweet_index = keyword_index(tmp_path, ["tesla a", "tesla b", "tesla c"], authors=['Elon', 'nasa', 'elon'])
+    assert sorted(tweet_index.keyword_search("tesla", 10, author='@elon')) == [0, 2]
+    assert tweet_index.keyword_search("elon", 10) in ([0, 2], [2, 0])
+    assert len(tweet_index.keyword_search("tesla", 1)) == 1
+
+
+def test_bm25_incremental_add_matches_a_full_build(tmp_path):
+    texts = ["#tesla news", "tesla stock", "@elon on tesla", "other"]
+    incremental = keyword_index(tmp_path / 'incremental', texts[:2])
+    incremental.add_records([{'id': str(i), 'text': text} for i, text in enumerate(texts) if i >= 2])
+    assert incremental.keyword_search("tesla", 4) == keyword_index(tmp_path / 'full', texts).keyword_search("tesla", 4)
+    assert incremental.keyword_search("#tesla", 1) == [0]
+
+
+def test_docstore_without_keywords_gets_them_on_open(tmp_path):
+    docstore = keyword_index(tmp_path, ["tesla news", "spacex launch"]).docstore
+    docstore.execute("DROP TABLE keywords")
+    docstore.commit()
+    assert docstore.execute("SELECT name FROM sqlite_master WHERE name = 'keywords'").fetchone() is None
+    reopened, added = open_index(tmp_path, dedupe=False)
+    assert added == 0
+    assert reopened.keyword_search("spacex", 10) == [1]
@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+
+from conversation import ConversationMemory, document_key
+from documents import count_tokens
+
+
+def tweet(tweet_id, text='text'):
+    return Document(page_content=text, metadata={'id': tweet_id})
+
+
+def test_turns_become_messages_in_order():
+    memory = ConversationMemory()
+    memory.add("q1", "user 1", "answer 1", [])
+    memory.add("q2", "user 2", "answer 2", [])
+    assert memory.messages() == [
+        {"role": "user", "content": "user 1"},
+        {"role": "assistant", "content": "answer 1"},
+        {"role": "user", "content": "user 2"},
+        {"role": "assistant", "content": "answer 2"},
+    ]
+
+
+def test_oldest_turns_fold_into_the_summary_past_the_budget():
+    turn_tokens = count_tokens("user message " * 20) + count_tokens("answer " * 20)
+    memory = ConversationMemory(max_tokens=turn_tokens * 2)
+    for i in range(4):
+        memory.add(f"question {i}", "user message " * 20, "answer " * 20, [])
+    assert [turn['question'] for turn in memory.turns] == ["question 2", "question 3"]
+    assert memory.summary == ["question 0", "question 1"]
+    assert memory.messages()[0] == {
+        "role": "system", "content": "Earlier in this conversation the user asked: question 0; question 1",
+    }
+    assert memory.tokens <= memory.max_tokens
+
+
+def test_a_single_oversized_turn_is_kept():
+    memory = ConversationMemory(max_tokens=5)
+    memory.add("q", "long user message " * 10, "long answer " * 10, [])
+    assert len(memory.turns) == 1
+
+
+def test_summary_drops_oldest_questions_past_its_budget():
+    memory = ConversationMemory(max_tokens=1, summary_tokens=count_tokens("question number 1; question number 2"))
+    for i in range(5):
+        memory.add(f"question number {i}", "user", "answer", [])
+    assert memory.summary == ["question number 2", "question number 3"]
+
+
+def test_tweets_quoted_by_a_remembered_turn_are_not_sent_again():
+    memory = ConversationMemory()
+    memory.add("q1", "user", "answer", [tweet('1'), tweet('2')])
+    fresh = memory.unseen([tweet('2'), tweet('3'), tweet('3')])
+    assert [document.metadata['id'] for document in fresh] == ['3']
+
+
+def test_evicted_turns_release_their_tweets():
+    memory = ConversationMemory(max_tokens=count_tokens("user") + count_tokens("answer"))
+    memory.add("q1", "user", "answer", [tweet('1')])
+    memory.add("q2", "user", "answer", [tweet('2')])
+    assert memory.seen() == {'2'}
+    assert [document.metadata['id'] for document in memory.unseen([tweet('1')])] == ['1']
+
+
+def test_document_key_prefers_ids():
+    assert document_key(Document(page_content='a', metadata={'ids': ['1', '2']})) == ('1', '2')
+    assert document_key(Document(page_content='a', metadata={})) == 'a'
+
+
+def test_clear_forgets_everything():
+    memory = ConversationMemory()
+    memory.add("q", "user", "answer", [tweet('1')])
+    memory.clear()
+    assert memory.messages() == [] and memory.seen() == set()
+
+
+def test_digest_follows_the_remembered_turns():
+    memory = ConversationMemory()
+    assert memory.digest() == ''
+    memory.add("q1", "q1", "a1", [])
+    digest = memory.digest()
+    assert digest and digest == memory.digest()
+    memory.add("q2", "q2", "a2", [])
+    assert memory.digest() != digest
+    memory.clear()
+    assert memory.digest() == ''
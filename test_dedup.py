@@ -0,0 +1,44 @@
+from dedup import Deduplicator, canonical_text
+
+BASE = "the quick brown fox jumps over the lazy dog near the river bank today"
+
+
+def test_canonical_text_drops_retweet_prefix_links_and_spacing():
+    assert canonical_text("RT @someone: Big   news https://t.co/abc!") == "big news"
+
+
+def test_exact_and_near_duplicates_share_a_cluster():
+    texts = [BASE, BASE.upper(), f"RT @fox: {BASE} https://t.co/x", BASE.replace("today", "tonight"), "unrelated tweet"]
+    roots = Deduplicator().clusters(texts).tolist()
+    assert roots[:4] == [0, 0, 0, 0]
+    assert roots[4] == 4
+
+
+def test_different_tweets_stay_apart():
+    texts = [f"tweet number {i} about topic {i * 7} with its own words {i * 13}" for i in range(200)]
+    assert Deduplicator().clusters(texts).tolist() == list(range(200))
+
+
+def test_collapse_keeps_the_original_over_retweets():
+    records = [{'id': '1', 'text': f"RT @fox: {BASE}"}, {'id': '2', 'text': BASE}, {'id': '3', 'text': "other"}]
+    kept, stats = Deduplicator().collapse(records)
+    assert [record['id'] for record in kept] == ['2', '3']
+    assert stats == {'records': 3, 'kept': 2, 'reduction': 1 - 2 / 3}
+
+
+def test_collapse_keeps_the_preferred_record():
+    records = [{'id': '1', 'text': BASE}, {'id': '2', 'text': BASE + "!"}]
+    kept, _ = Deduplicator().collapse(records, prefer=lambda record: record['id'] == '2')
+    assert [record['id'] for record in kept] == ['2']
+
+
+def test_collapse_of_nothing():
+    assert Deduplicator().collapse([]) == ([], {'records': 0, 'kept': 0, 'reduction': 0.0})
+
+
+def test_tweets_without_words_are_not_duplicates_of_each_other():
+    texts = ["https://t.co/abc", "🔥🔥🔥", "https://t.co/zzz 🚀", "https://t.co/abc", "🔥🔥🔥"]
+    assert Deduplicator().clusters(texts).tolist() == [0, 1, 2, 0, 1]
+    records = [{'id': str(i), 'text': text} for i, text in enumerate(texts)]
+    kept, _ = Deduplicator().collapse(records)
+    assert [record['id'] for record in kept] == ['0', '1', '2']
@@ -0,0 +1,25 @@
+from embedding_cache import CachedEmbeddings
+from embeddings import HashingEmbeddings
+
+
+def test_cache_keeps_the_most_recently_used_vectors(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CachedEmbeddings(HashingEmbeddings(), path, max_entries=3)
+    cache.embed_documents(["one", "two", "three"])
+    cache.embed_documents(["one", "four", "four"])
+    assert cache.count == 3
+    assert cache.connection.execute('SELECT COUNT(*) FROM embeddings').fetchone() == (3,)
+
+    reopened = CachedEmbeddings(HashingEmbeddings(), path, max_entries=3)
+    assert reopened.count == 3
+    reopened.embed_documents(["one", "four", "five"])
+    assert reopened.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3}
+    assert reopened.count == 3
+
+
+def test_cache_returns_the_backend_vectors(tmp_path):
+    backend = HashingEmbeddings()
+    cache = CachedEmbeddings(backend, str(tmp_path / "cache.sqlite"))
+    first = cache.embed_documents(["hello world", "hello  world "])
+    assert first[0] == first[1] == cache.embed_documents(["hello world"])[0]
+    assert cache.embed_query("hello world") == backend.embed_query("hello world")
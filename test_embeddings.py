@@ -0,0 +1,27 @@
+import numpy as np
+
+from embeddings import HashingEmbeddings
+
+
+def test_hashing_vectors_are_normalised_and_repeatable():
+    embeddings = HashingEmbeddings()
+    vectors = embeddings.encode_batch(["Tesla launch today", "", "#Tesla by @elon, ünïcode", "tesla LAUNCH today"])
+    assert vectors.shape == (4, 1024)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), [1, 0, 1, 1], atol=1e-6)
+    assert np.array_equal(vectors[0], vectors[3])
+    assert np.array_equal(vectors[2], HashingEmbeddings().encode_batch(["#tesla by @ELON, ÜNÏCODE"])[0])
+
+
+def test_hashing_shared_words_are_closer():
+    same, close, other = HashingEmbeddings().encode_batch(
+        ["rocket launch today", "rocket launch tonight", "bitcoin court ruling"])
+    assert same @ close > 0.5
+    assert abs(same @ other) < 0.2
+
+
+def test_hashing_batches_match_single_texts_without_memoising_words():
+    embeddings = HashingEmbeddings(batch_size=3)
+    texts = [f"word{i} shared word{i * 7}" for i in range(10)]
+    batched = embeddings.encode(texts)
+    assert np.allclose(batched, np.vstack([embeddings.encode_batch([text]) for text in texts]))
+    assert vars(embeddings).keys() == {'n_features', 'batch_size', 'workers', 'model'}
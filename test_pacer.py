@@ -0,0 +1,67 @@
+from pacer import AdaptivePacer, FixedPacer
+
+
+def run(pacer, windows, start=0.0):
+    # Each window is (new items, seconds until they loaded), the pacer adjusts when the next scroll closes it
+    now = start
+    for new_items, latency in windows:
+        pacer.scrolled(now)
+        pacer.observe(new_items, now + latency)
+        now += pacer.interval
+    pacer.scrolled(now)
+    return now
+
+
+def test_speeds_up_while_tweets_keep_arriving():
+    pacer = AdaptivePacer(4.0, speedup=0.5)
+    run(pacer, [(10, 0.1)] * 3)
+    assert pacer.interval == 0.5
+    assert not pacer.exhausted
+
+
+def test_exhausted_after_patience_empty_scrolls():
+    pacer = AdaptivePacer(1.0, patience=3, max_interval=8.0)
+    run(pacer, [(0, 0.0)] * 2)
+    assert not pacer.exhausted
+    assert pacer.interval == 4.0
+    run(pacer, [(0, 0.0)])
+    assert pacer.exhausted
+    assert pacer.interval == 8.0
+
+
+def test_productive_scroll_resets_the_empty_count():
+    pacer = AdaptivePacer(1.0, patience=2)
+    run(pacer, [(0, 0.0), (5, 0.1), (0, 0.0)])
+    assert not pacer.exhausted
+
+
+def test_floor_rises_to_the_last_productive_interval_after_an_empty_scroll():
+    pacer = AdaptivePacer(2.0, min_interval=0.25, speedup=0.5, backoff=2.0)
+    run(pacer, [(10, 0.1), (10, 0.1), (0, 0.0)])
+    assert pacer.floor == 1.0
+    run(pacer, [(10, 0.1)] * 5)
+    assert pacer.interval == 1.0
+
+
+def test_slow_load_backs_off_without_counting_as_empty():
+    pacer = AdaptivePacer(1.0, slow_load=3.0)
+    run(pacer, [(10, 5.0)])
+    assert pacer.interval == 2.0
+    assert pacer.empty_scrolls == 0
+
+
+def test_latency_is_measured_to_the_first_new_items():
+    pacer = AdaptivePacer(1.0)
+    pacer.scrolled(10.0)
+    pacer.observe(0, 10.5)
+    pacer.observe(4, 11.5)
+    pacer.observe(4, 12.0)
+    assert pacer.window_latency == 1.5
+    assert pacer.window_items == 8
+
+
+def test_fixed_pacer_never_changes():
+    pacer = FixedPacer(2.0)
+    run(pacer, [(0, 0.0)] * 10)
+    assert pacer.interval == 2.0
+    assert not pacer.exhausted
@@ -0,0 +1,44 @@
+from answer import NO_MATCHES_ANSWER, NO_TWEETS_ANSWER, AnswerPipeline
+from retrieval import parse_query, reciprocal_rank_fusion, tokenize
+
+
+def test_parse_query_turns_operators_into_filters():
+    assert parse_query("FROM:@ElonMusk what about #Tesla since:2024-01-01 until:2024-02-01") == (
+        "what about #Tesla", {'author': 'elonmusk', 'since': '2024-01-01', 'until': '2024-02-01'},
+    )
+    assert parse_query("just a question") == ("just a question", {})
+
+
+def test_tokenize_keeps_hashtags_and_handles_with_their_bare_forms():
+    assert tokenize("#Tesla by @Elon, ok") == ['#tesla', 'tesla', 'by', '@elon', 'elon', 'ok']
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    assert reciprocal_rank_fusion([[1, 2, 3], [2, 4, 5]]) == [2, 1, 4, 3, 5]
+    assert reciprocal_rank_fusion([[5], []]) == [5]
+
+
+class EmptyIndex:
+    # Stand-in for TweetIndex: `ntotal` counts the indexed tweets, searches find nothing
+    def __init__(self, has_tweets):
+        self.ntotal = 1 if has_tweets else 0
+        self.searches = []
+
+    def search(self, query, k, vector=None, **filters):
+        self.searches.append((query, filters))
+        return []
+
+
+def test_filters_that_match_nothing_get_their_own_answer():
+    tweet_index = EmptyIndex(has_tweets=True)
+    pipeline = AnswerPipeline(None, tweet_index)
+    pipeline.query_vector = lambda query: None
+    assert pipeline.answer("from:nobody tesla") == NO_MATCHES_ANSWER
+    assert tweet_index.searches == [("tesla", {'author': 'nobody'})]
+    assert pipeline.answer("tesla") == NO_TWEETS_ANSWER
+
+
+def test_empty_index_asks_for_the_scraper():
+    pipeline = AnswerPipeline(None, EmptyIndex(has_tweets=False))
+    pipeline.query_vector = lambda query: None
+    assert pipeline.answer("from:elon tesla") == NO_TWEETS_ANSWER
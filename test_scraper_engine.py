@@ -0,0 +1,89 @@
+import asyncio
+
+import scraper_engine
+from scraper_engine import ScraperEngine
+from seen_store import SeenTweets
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+
+    async def write(self, records):
+        self.records.extend(records)
+
+    async def close(self):
+        pass
+
+
+class Passthrough:
+    async def normalize(self, records):
+        return list(records)
+
+
+class LoadingPage:
+    # Timeline whose tweets show up on the `ready`-th extract
+    def __init__(self, ready):
+        self.ready = ready
+        self.extracts = 0
+
+    async def evaluate(self, script, *args):
+        self.extracts += 1
+        return [{'id': '1', 'text': "loaded"}] if self.extracts >= self.ready else []
+
+
+def make_engine(**options):
+    return ScraperEngine(60, 1, sink=ListSink(), seen=SeenTweets(path=None), normalizer=Passthrough(), **options)
+
+
+def capture_loaded(engine, page, timeout):
+    async def run():
+        loop = asyncio.get_running_loop()
+        engine.started_at = loop.time()
+        return await engine.capture_loaded(page, loop.time() + timeout)
+
+    return asyncio.run(run())
+
+
+def test_fixed_pacing_extracts_once_per_scroll():
+    page = LoadingPage(ready=3)
+    assert capture_loaded(make_engine(adaptive=False), page, timeout=1.0) == 0
+    assert page.extracts == 1
+
+
+def test_adaptive_pacing_polls_until_the_tweets_load(monkeypatch):
+    monkeypatch.setattr(scraper_engine, 'LOAD_POLL_INTERVAL', 0.01)
+    page = LoadingPage(ready=3)
+    assert capture_loaded(make_engine(adaptive=True), page, timeout=1.0) == 1
+    assert page.extracts == 3
+
+
+class FailingSink(ListSink):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    async def write(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        await super().write(records)
+
+
+def test_tweets_of_a_failed_save_are_saved_by_the_next_capture(tmp_path):
+    engine = make_engine()
+    engine.sink = FailingSink(failures=1)
+    engine.seen = SeenTweets(str(tmp_path / 'seen.bin'))
+    records = [{'id': '1', 'text': "first"}, {'id': '2', 'text': "second"}]
+
+    async def run():
+        engine.started_at = asyncio.get_running_loop().time()
+        try:
+            await engine.save_new(records)
+        except OSError:
+            pass
+        return await engine.save_new(records)
+
+    assert asyncio.run(run()) == 2
+    assert engine.sink.records == records
+    assert len(SeenTweets(str(tmp_path / 'seen.bin'))) == 2
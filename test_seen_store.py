@@ -0,0 +1,54 @@
+from seen_store import SeenTweets, tweet_key
+
+
+def saved(seen, records):
+    new_records, keys = seen.filter_new(records)
+    seen.commit(keys)
+    return new_records
+
+
+def test_filter_new_drops_repeats_within_and_across_batches():
+    seen = SeenTweets(path=None)
+    assert saved(seen, [{'id': '1', 'text': 'a'}, {'id': '1', 'text': 'a'}, {'id': '2', 'text': 'b'}]) == [
+        {'id': '1', 'text': 'a'}, {'id': '2', 'text': 'b'},
+    ]
+    assert saved(seen, [{'id': '2', 'text': 'edited'}, {'id': '3', 'text': 'c'}]) == [{'id': '3', 'text': 'c'}]
+    assert len(seen) == 3
+
+
+def test_text_key_ignores_whitespace_and_id_wins_over_text():
+    assert tweet_key({'text': 'hello   world\n'}) == tweet_key({'text': 'hello world'})
+    assert tweet_key({'id': '7', 'text': 'x'}) == tweet_key({'id': '7', 'text': 'y'})
+    assert tweet_key({'id': '7', 'text': 'x'}) != tweet_key({'text': 'x'})
+
+
+def test_keys_persist_across_runs(tmp_path):
+    path = str(tmp_path / 'seen.bin')
+    first = SeenTweets(path)
+    saved(first, [{'id': '1'}, {'text': 'no id'}])
+    first.flush()
+    saved(first, [{'id': '2'}])
+    first.flush()
+
+    second = SeenTweets(path)
+    assert len(second) == 3
+    assert {'id': '1'} in second and {'text': 'no  id'} in second
+    assert saved(second, [{'id': '1'}, {'id': '2'}, {'id': '3'}]) == [{'id': '3'}]
+
+
+def test_unflushed_keys_are_not_persisted(tmp_path):
+    path = str(tmp_path / 'seen.bin')
+    saved(SeenTweets(path), [{'id': '1'}])
+    assert len(SeenTweets(path)) == 0
+
+
+def test_claimed_keys_are_seen_only_once_committed(tmp_path):
+    path = str(tmp_path / 'seen.bin')
+    seen = SeenTweets(path)
+    new_records, keys = seen.filter_new([{'id': '1'}, {'id': '2'}])
+    assert seen.filter_new([{'id': '1'}]) == ([], [])  # a save in progress
+    seen.release(keys)
+    seen.flush()
+    assert len(seen) == 0 and {'id': '1'} not in seen
+    assert seen.filter_new([{'id': '1'}])[0] == [{'id': '1'}]
+    assert len(SeenTweets(path)) == 0
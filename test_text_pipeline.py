@@ -0,0 +1,47 @@
+import asyncio
+
+from text_pipeline import TextNormalizer, detect_language, normalize_record, normalize_text
+
+
+def test_plain_text_keeps_angle_brackets():
+    assert normalize_text("a<b and c>d") == "a<b and c>d"
+    assert normalize_text("love you <3  \r\n\r\n\r\n\r\nbye") == "love you <3\n\nbye"
+
+
+def test_markup_strips_tags_and_entities():
+    assert normalize_text("<p>Fish &amp; chips</p><br>today", markup=True) == "Fish & chips today"
+    assert normalize_text("a<b and c>d", markup=True) == "a d"
+
+
+def test_urls_drop_trailing_punctuation():
+    record = normalize_record({'text': "Read https://example.com/a, then (https://example.com/b). https://example.com/a!"})
+    assert record['urls'] == ["https://example.com/a", "https://example.com/b"]
+
+
+def test_mentions_and_hashtags_are_extracted_outside_urls():
+    record = normalize_record({'text': "Hi @Alice and @bob, #AI #ai news see https://x.com/#anchor mail me@example.com"})
+    assert record['mentions'] == ["alice", "bob"]
+    assert record['hashtags'] == ["ai"]
+
+
+def test_raw_text_is_kept_only_when_normalisation_changed_it():
+    changed = normalize_record({'id': '1', 'text': "  spaced   out text "})
+    assert changed['text'] == "spaced out text"
+    assert changed['raw_text'] == "  spaced   out text "
+    assert changed['id'] == '1'
+    assert 'raw_text' not in normalize_record({'text': "already clean"})
+
+
+def test_language_detection():
+    assert detect_language("the cat is on the mat and it is happy") == 'en'
+    assert detect_language("el perro y la casa de los amigos") == 'es'
+    assert detect_language("Привет, как дела?") == 'ru'
+    assert detect_language("1234 !!") == 'und'
+
+
+def test_normalizer_without_a_pool_keeps_order():
+    normalizer = TextNormalizer(workers=0, chunk_size=2)
+    records = [{'id': str(i), 'text': f"tweet {i}  #n{i}"} for i in range(5)]
+    normalized = asyncio.run(normalizer.normalize(records))
+    assert [record['id'] for record in normalized] == ['0', '1', '2', '3', '4']
+    assert normalized[3]['hashtags'] == ['n3']
@@ -0,0 +1,18 @@
+from tweet_store import TweetStore
+
+
+def test_legacy_file_is_imported_once_even_into_a_store_with_records(tmp_path):
+    store = TweetStore(str(tmp_path / 'store'))
+    store.append_records([{'id': '1', 'text': "scraped first"}])
+    legacy = tmp_path / 'tweets.txt'
+    legacy.write_text('"old tweet"\n"another, older"\n', encoding='utf-8')
+    assert store.import_legacy(str(legacy)) == 2
+    assert store.import_legacy(str(legacy)) == 0
+    assert TweetStore(store.directory).import_legacy(str(legacy)) == 0
+    assert [record['text'] for record in store.iter_records()] == ["scraped first", "old tweet", "another, older"]
+
+
+def test_missing_legacy_file_imports_nothing(tmp_path):
+    store = TweetStore(str(tmp_path / 'store'))
+    assert store.import_legacy(str(tmp_path / 'tweets.txt')) == 0
+    assert store.imported_files() == []
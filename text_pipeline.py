@@ -0,0 +1,128 @@
+import asyncio
+import html
+import multiprocessing
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+URL = re.compile(r"https?://[^\s<>\"']+|www\.[^\s<>\"']+", re.IGNORECASE)
+HANDLE = re.compile(r"(?<![\w@])@(\w{1,30})")
+HASHTAG = re.compile(r"(?<![\w#])#(\w+)")
+HTML_TAG = re.compile(r"<[^<>]+>")
+HORIZONTAL_SPACE = re.compile(r"[^\S\n]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+WORD = re.compile(r"[^\W\d_]+")
+TRAILING_URL_PUNCTUATION = '.,;:!?)]}\'"'
+
+# The first script with at least MIN_SCRIPT_SHARE of the letters decides non-Latin languages, Latin text is scored
+# by the share of its words that are common function words of each language
+SCRIPTS = (
+    ('ja', re.compile(r"[\u3040-\u30ff]")),
+    ('ko', re.compile(r"[\uac00-\ud7af\u1100-\u11ff]")),
+    ('zh', re.compile(r"[\u4e00-\u9fff]")),
+    ('ar', re.compile(r"[\u0600-\u06ff]")),
+    ('ru', re.compile(r"[\u0400-\u04ff]")),
+    ('hi', re.compile(r"[\u0900-\u097f]")),
+    ('el', re.compile(r"[\u0370-\u03ff]")),
+    ('he', re.compile(r"[\u0590-\u05ff]")),
+    ('th', re.compile(r"[\u0e00-\u0e7f]")),
+)
+MIN_SCRIPT_SHARE = 0.3
+STOPWORDS = {
+    'en': set("the and is are was to of in that it for on with this you he she they we not be have at but what".split()),
+    'es': set("el la los las de que y en un una es por para con no se del lo como más pero".split()),
+    'fr': set("le la les de des et est un une que qui dans pour pas sur au avec ce il elle".split()),
+    'de': set("der die das und ist nicht ein eine zu den mit von sich auf für auch es ich".split()),
+    'pt': set("o a os as de que e do da em um uma para com não é por mais se".split()),
+    'it': set("il la di che e è un una per non con del della sono ma più si".split()),
+    'nl': set("de het een en van is dat niet op te zijn met voor ik je".split()),
+    'tr': set("ve bir bu da de için ile ne çok ama değil gibi olan var ben".split()),
+}
+
+
+def detect_language(text):
+    letters = WORD.findall(text)
+    if not letters:
+        return 'und'
+    letter_count = sum(len(word) for word in letters)
+    for language, pattern in SCRIPTS:
+        if len(pattern.findall(text)) >= MIN_SCRIPT_SHARE * letter_count:
+            return language
+    words = [word.lower() for word in letters]
+    scores = {language: sum(word in stopwords for word in words) for language, stopwords in STOPWORDS.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] else 'und'
+
+
+def normalize_text(text, markup=False):
+    # Tweets come from innerText and are plain text already, "a<b" or "<3" is not a tag there. Tags and entities
+    # are only stripped for sources that hand over HTML (markup=True). Line breaks are kept, blank runs shortened.
+    text = unicodedata.normalize('NFKC', text or '')
+    if markup:
+        text = html.unescape(HTML_TAG.sub(' ', text))
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = (HORIZONTAL_SPACE.sub(' ', line).strip() for line in text.split('\n'))
+    return BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def unique(values):
+    return list(dict.fromkeys(values))
+
+
+def normalize_record(record, markup=False):
+    raw_text = record.get('text') or ''
+    text = normalize_text(raw_text, markup)
+    urls = unique(url.rstrip(TRAILING_URL_PUNCTUATION) for url in URL.findall(text))
+    without_urls = URL.sub(' ', text)
+    normalized = dict(record)
+    normalized.update(
+        text=text,
+        urls=urls,
+        mentions=unique(handle.lower() for handle in HANDLE.findall(without_urls)),
+        hashtags=unique(tag.lower() for tag in HASHTAG.findall(without_urls)),
+        lang=detect_language(HASHTAG.sub(' ', HANDLE.sub(' ', without_urls))),
+    )
+    if text != raw_text:
+        # The text as scraped, kept whenever normalisation changed it
+        normalized['raw_text'] = raw_text
+    return normalized
+
+
+def normalize_batch(records, markup=False):
+    # Runs in a pool process, one pickled chunk of records per call
+    return [normalize_record(record, markup) for record in records]
+
+
+class TextNormalizer:
+    # Normalises and enriches scraped records (NFKC, whitespace, HTML stripping for markup sources,
+    # urls/mentions/hashtags, language) in a process pool, chunk_size records per task, so the scraper's event loop
+    # only awaits the result. workers=0 runs chunks on the event loop's default thread executor instead, for small
+    # machines and benchmarks. Pool processes are spawned, not forked: the pool starts inside a multi-threaded
+    # process (Qt, the API client, the live indexer) and a forked child can inherit a lock held by another thread.
+    def __init__(self, workers=None, chunk_size=256):
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.pool = None
+
+    def executor(self):
+        if self.workers and self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    async def normalize(self, records, markup=False):
+        records = list(records)
+        if not records:
+            return []
+        loop = asyncio.get_running_loop()
+        executor = self.executor()
+        chunks = [records[start:start + self.chunk_size] for start in range(0, len(records), self.chunk_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, normalize_batch, chunk, markup) for chunk in chunks)
+        )
+        return [record for chunk in results for record in chunk]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
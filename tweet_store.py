@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+from datetime import datetime, timezone
+
+STORE_DIR = 'tweet_store'
+LEGACY_MARKER = 'legacy-imports.json'
+FIELDS = ('id', 'author', 'timestamp', 'text', 'scraped_at')
+ENRICHMENT_FIELDS = ('raw_text', 'lang', 'urls', 'mentions', 'hashtags', 'metrics')
+
+
+def make_record(record, scraped_at=None):
+    stored = {field: record.get(field) for field in FIELDS}
+    stored['scraped_at'] = scraped_at or record.get('scraped_at') or datetime.now(timezone.utc).isoformat()
+    for field in ENRICHMENT_FIELDS:
+        if record.get(field):
+            stored[field] = record[field]
+    return stored
+
+
+def iter_records(directory=STORE_DIR):
+    for path in sorted(glob.glob(os.path.join(directory, 'tweets-*.jsonl'))):
+        with open(path, encoding='utf-8') as segment:
+            for line in segment:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class TweetStore:
+    # Line-delimited JSON split into numbered segments. write() only queues records, a writer task batches them
+    # (by count or after flush_interval seconds), appends each batch in one write off the event loop and starts a
+    # new segment once the current one reaches max_segment_bytes. Readers stream the segments line by line.
+    def __init__(self, directory=STORE_DIR, batch_size=500, flush_interval=1.0, max_segment_bytes=64 * 1024 * 1024, max_pending=10000):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.max_pending = max_pending
+        self.queue = None
+        self.writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'tweets-*.jsonl')))
+
+    def has_records(self):
+        return any(os.path.getsize(path) > 0 for path in self.segments())
+
+    def iter_records(self):
+        return iter_records(self.directory)
+
+    def read_since(self, offsets):
+        # Records appended after the given byte offsets per segment, plus the offsets to resume from next time.
+        # A last line still being written has no newline yet and is left for the next call.
+        records = []
+        positions = dict(offsets)
+        for path in self.segments():
+            name = os.path.basename(path)
+            start = offsets.get(name, 0)
+            with open(path, 'rb') as segment:
+                segment.seek(start)
+                data = segment.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            records.extend(json.loads(line) for line in complete.splitlines() if line.strip())
+            positions[name] = start + len(complete)
+        return records, positions
+
+    def scan_since(self, offsets):
+        # (segment name, offset after the record, record) for every complete line after the given offsets
+        for path in self.segments():
+            name = os.path.basename(path)
+            position = offsets.get(name, 0)
+            with open(path, 'rb') as segment:
+                segment.seek(position)
+                data = segment.read()
+            for line in data[:data.rfind(b'\n') + 1].splitlines(keepends=True):
+                position += len(line)
+                if line.strip():
+                    yield name, position, json.loads(line)
+
+    def current_segment(self):
+        segments = self.segments()
+        if segments and os.path.getsize(segments[-1]) < self.max_segment_bytes:
+            return segments[-1]
+        number = int(os.path.basename(segments[-1])[len('tweets-'):-len('.jsonl')]) + 1 if segments else 1
+        return os.path.join(self.directory, 'tweets-%05d.jsonl' % number)
+
+    def append_lines(self, lines):
+        with open(self.current_segment(), 'a', encoding='utf-8') as segment:
+            segment.write(''.join(lines))
+
+    def append_records(self, records):
+        self.append_lines([json.dumps(make_record(record), ensure_ascii=False) + '\n' for record in records])
+
+    async def write(self, records):
+        if self.writer is None:
+            self.queue = asyncio.Queue(self.max_pending)
+            self.writer = asyncio.create_task(self.run_writer())
+        scraped_at = datetime.now(timezone.utc).isoformat()
+        for record in records:
+            # Blocks the scraper when the writer falls max_pending records behind
+            await self.queue.put(make_record(record, scraped_at))
+
+    async def run_writer(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                if self.queue.empty():
+                    if loop.time() >= deadline:
+                        break
+                    await asyncio.sleep(min(0.05, deadline - loop.time()))
+                    continue
+                batch.append(self.queue.get_nowait())
+            if batch[-1] is None:
+                closing = True
+                batch.pop()
+            if batch:
+                lines = [json.dumps(record, ensure_ascii=False) + '\n' for record in batch]
+                await loop.run_in_executor(None, self.append_lines, lines)
+
+    async def close(self):
+        # Flushes whatever is still buffered
+        if self.writer is not None:
+            await self.queue.put(None)
+            await self.writer
+            self.writer = None
+            self.queue = None
+
+    def import_csv(self, path='tweets.txt'):
+        # Converts the single-column CSV the scraper used to write into store records
+        with open(path, newline='', encoding='utf-8') as csvfile:
+            records = [{'text': row[0]} for row in csv.reader(csvfile) if row and row[0].strip()]
+        for start in range(0, len(records), self.batch_size):
+            self.append_records(records[start:start + self.batch_size])
+        return len(records)
+
+    def imported_files(self):
+        try:
+            with open(os.path.join(self.directory, LEGACY_MARKER), encoding='utf-8') as marker:
+                return json.load(marker)
+        except FileNotFoundError:
+            return []
+
+    def import_legacy(self, path='tweets.txt'):
+        # import_csv once per file, recorded in a marker next to the segments, whether or not the store already
+        # holds scraped records. Returns the number of tweets imported, 0 when already done or there is no file.
+        name = os.path.abspath(path)
+        imported = self.imported_files()
+        if name in imported or not os.path.exists(path):
+            return 0
+        count = self.import_csv(path)
+        marker = os.path.join(self.directory, LEGACY_MARKER)
+        with open(marker + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(imported + [name], file)
+        os.replace(marker + '.tmp', marker)
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import the legacy tweets.txt into the tweet store")
+    parser.add_argument('csv_path', nargs='?', default='tweets.txt')
+    parser.add_argument('--store', default=STORE_DIR)
+    args = parser.parse_args(argv)
+    print(f"Imported {TweetStore(args.store).import_legacy(args.csv_path)} tweets into {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import importlib
+import os
+import threading
+
+# Modules the windows import lazily, by the feature that needs them
+SCRAPER_MODULES = ('scraper_engine',)
+CHAT_MODULES = (
+    'chat_index', 'answer', 'answer_cache', 'api_client', 'conversation', 'embedding_cache', 'embeddings', 'live_index',
+)
+WARM_UP = os.environ.get('TWEET_WARMUP', '1') != '0'
+
+
+def warm_up(modules):
+    # Imports the modules on a daemon thread after the window is shown, so the first Start or chat click finds them
+    # loaded. A click during warm-up waits on the module's import lock instead of importing it twice.
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # the import is retried, and its error reported, when the feature is used
+
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
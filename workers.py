@@ -0,0 +1,88 @@
+import asyncio
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+
+class ScraperWorker(QThread):
+    status = pyqtSignal(str)
+    progress = pyqtSignal(int, float)  # tweets saved, tweets per second
+    failed = pyqtSignal(str)
+
+    def __init__(self, engine, platform='twitter', parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.platform = platform
+        self.loop = None
+        self.task = None
+        self.stop_requested = False
+
+        # The engine runs on this thread's event loop, signals hand the updates back to the GUI thread
+        self.engine.on_status = self.status.emit
+        self.engine.on_progress = self.progress.emit
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.task = self.loop.create_task(self.engine.run(self.platform))
+            if self.stop_requested:
+                self.task.cancel()
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            self.status.emit("Scraper stopped")
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        self.stop_requested = True
+        if self.loop is not None and self.task is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self.task.cancel)
+            except RuntimeError:
+                pass  # The loop closed between the check and the call, the scraper has already finished
+
+
+class ChatWorker(QThread):
+    token = pyqtSignal(str)
+    answered = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, pipeline, prompt, parent=None):
+        super().__init__(parent)
+        self.pipeline = pipeline
+        self.prompt = prompt
+
+    def run(self):
+        try:
+            tokens = []
+            for token in self.pipeline.stream(self.prompt):
+                tokens.append(token)
+                self.token.emit(token)
+            self.answered.emit("".join(tokens))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class SignInWorker(QThread):
+    signed_in = pyqtSignal(object)  # the user, None for a wrong username or password
+    failed = pyqtSignal(str)
+
+    def __init__(self, auth, username, password, parent=None):
+        super().__init__(parent)
+        self.auth = auth
+        self.username = username
+        self.password = password
+
+    def run(self):
+        try:
+            self.signed_in.emit(self.auth.login(self.username, self.password))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class LiveIndexSignals(QObject):
+    # Carries LiveIndexer callbacks from its thread to the GUI thread
+    indexed = pyqtSignal(int, float)  # documents added, seconds since the scraper queued them
+    failed = pyqtSignal(str)